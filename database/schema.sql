@@ -60,19 +60,19 @@ CREATE VIRTUAL TABLE IF NOT EXISTS laws_fts USING fts5(
     tokenize='trigram'
 );
 
--- FTS5 触发器
-CREATE TRIGGER IF NOT EXISTS laws_fts_insert AFTER INSERT ON laws BEGIN
-    INSERT INTO laws_fts(rowid, title, content)
-    VALUES (new.id, new.title, new.content);
+-- FTS5 触发器 (external content 表: 删除/更新须以 'delete' 命令带旧值移除索引项)
+CREATE TRIGGER IF NOT EXISTS laws_ai AFTER INSERT ON laws BEGIN
+    INSERT INTO laws_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
 END;
 
-CREATE TRIGGER IF NOT EXISTS laws_fts_update AFTER UPDATE ON laws BEGIN
-    UPDATE laws_fts SET title = new.title, content = new.content
-    WHERE rowid = new.id;
+CREATE TRIGGER IF NOT EXISTS laws_ad AFTER DELETE ON laws BEGIN
+    INSERT INTO laws_fts(laws_fts, rowid, title, content) VALUES('delete', old.id, old.title, old.content);
 END;
 
-CREATE TRIGGER IF NOT EXISTS laws_fts_delete AFTER DELETE ON laws BEGIN
-    DELETE FROM laws_fts WHERE rowid = old.id;
+-- 仅 title/content 变化时才需重新索引 (status 等更新不触发)
+CREATE TRIGGER IF NOT EXISTS laws_au AFTER UPDATE OF title, content ON laws BEGIN
+    INSERT INTO laws_fts(laws_fts, rowid, title, content) VALUES('delete', old.id, old.title, old.content);
+    INSERT INTO laws_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
 END;
 
 -- 6. 法条全文搜索表 - (Skipping creation if articles table missing, but definition kept)
@@ -86,6 +86,7 @@ CREATE TABLE IF NOT EXISTS concept_synonyms (
     created_at TEXT DEFAULT (datetime('now'))
 );
 CREATE INDEX IF NOT EXISTS idx_concept_synonyms_term ON concept_synonyms(term);
+CREATE INDEX IF NOT EXISTS idx_concept_synonyms_canonical ON concept_synonyms(canonical_term);
 
 -- 8. 元数据表
 CREATE TABLE IF NOT EXISTS metadata (
@@ -1,6 +1,6 @@
 ﻿# -*- coding: utf-8 -*-
 """
-增强版MCP服务器 - 带连接池和缓存
+增强版MCP服务器 - 带线程本地连接和缓存
 极大提升查询速度
 """
 from mcp.server.fastmcp import FastMCP
@@ -9,15 +9,31 @@ import re
 import os
 import sys
 import logging
+import tempfile
+import time
 from pathlib import Path
+from collections import OrderedDict
 from functools import lru_cache
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import threading
 import jieba
 import jieba.analyse
+from article_splitter import cn2an_convert as _cn2an_convert
 
 # 同步预热 jieba 词典，避免首次搜索时 1-2s 的加载延迟
 jieba.initialize()
+
+@lru_cache(maxsize=4096)
+def _tokenize_cached(text: str) -> tuple:
+    """jieba 搜索引擎模式分词 (带缓存)"""
+    return tuple(jieba.lcut_for_search(text))
+
+@lru_cache(maxsize=1024)
+def _extract_tags_cached(text: str, top_k: int) -> tuple:
+    """jieba TF-IDF 关键词提取 (带缓存)"""
+    return tuple(jieba.analyse.extract_tags(text, topK=top_k))
+
 try:
     from query_rewriter import expand_query
 except ImportError:
@@ -44,17 +60,54 @@ except ImportError:
 
 DB_PATH = Path(__file__).parent / "legal_database.db"
 
+# 条号后缀 ("之一" 等)
+_ARTICLE_SUFFIX_RE = re.compile(r'^(.+?)(之[一二三四五六七八九十]+)?$')
+# 按 "第X条" 拆分正文
+_ARTICLE_SPLIT_RE = re.compile(r'(第[零一二三四五六七八九十百千万]+条)')
+# 是否包含中文字符
+_HAS_CJK = re.compile(r'[\u4e00-\u9fff]').search
+
+# 目录标题行: 第X编/章/节 + 非空标题 (单行内匹配，首尾空白含全角空格/\r 由模式吸收)
+_TOC_PAT = re.compile(r'^[^\S\n]*(第[一二三四五六七八九十百]+)(编|章|节)[^\S\n]+(\S[^\n]*?)[^\S\n]*$', re.M)
+
+# 法条引用识别 (batch_verify_citations)
+# 可选使用 google-re2 (DFA 单遍线性匹配，无回溯)，未安装时回退标准库 re
+try:
+    import re2 as _cite_re
+except ImportError:
+    _cite_re = re
+# 两种模式合并为一个分支，单遍扫描全文:
+#   1) 《法律名》第X条
+#   2) 无书名号，如 "民法典第147条" (法律名以法/典/条例/规定/办法结尾)
+# 均支持"之一"后缀；re2 不支持后向断言，模式2 前的 "《" 由 group(2) 捕获后丢弃
+_PAT_CITE = _cite_re.compile(
+    r'(?:《([^》]+)》|(《?)([一-龥]{2,10}(?:法|典|条例|规定|办法)))'
+    r'第([一二三四五六七八九十百千万零\d]+)条(?:之[一二三四五六七八九十]+)?'
+)
+
+# 长查询 (len > 4) 即使已有足够结果也追加向量检索；代价较高，默认关闭
+_AGGRESSIVE_SEMANTIC = os.environ.get("LEGAL_DB_AGGRESSIVE_SEMANTIC") == "1"
+
 # 向量引擎就绪标志 — 搜索函数会等待此 Event，避免与预加载竞争
 _vector_ready = threading.Event()
 
+# 向量检索线程池 (常驻线程，避免每次检索新建线程)
+_VEC_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vec")
+_VEC_IDX = None
+
+def _vec_idx():
+    """获取向量索引单例 (模块级持有，避免重复构造路径)"""
+    global _VEC_IDX
+    if _VEC_IDX is None:
+        _VEC_IDX = get_vector_index(str(DB_PATH))
+    return _VEC_IDX
+
 # Async preload of vector index to avoid cold start latency
 if vdb:
     def _preload_vector_index():
-        import time
         t0 = time.time()
         try:
-            from vector_db import get_vector_index
-            idx = get_vector_index(str(DB_PATH))
+            idx = _vec_idx()
             # Force load model + matrix
             idx._load()
             logger.info(f"Vector index preloaded in {time.time()-t0:.1f}s. Articles: {len(idx._article_ids)}")
@@ -69,52 +122,50 @@ if vdb:
 else:
     _vector_ready.set()  # 无向量引擎时立即标记就绪
 
-# ========== 连接池实现 ==========
-class ConnectionPool:
-    """简单的SQLite连接池"""
-    def __init__(self, db_path, pool_size=5):
-        self.db_path = db_path
-        self.pool_size = pool_size
-        self.connections = []
-        self.lock = threading.Lock()
-        
-        # 预创建连接
-        for _ in range(pool_size):
-            try:
-                conn = sqlite3.connect(db_path, check_same_thread=False)
-                conn.execute("PRAGMA journal_mode=WAL")
-                conn.execute("PRAGMA synchronous=NORMAL")
-                conn.execute("PRAGMA cache_size=-64000")
-                conn.execute("PRAGMA temp_store=MEMORY")
-                self.connections.append(conn)
-            except:
-                pass
-    
-    @contextmanager
-    def get_connection(self):
-        """获取连接的上下文管理器"""
-        with self.lock:
-            if self.connections:
-                conn = self.connections.pop()
-            else:
-                conn = sqlite3.connect(self.db_path, check_same_thread=False)
-                conn.execute("PRAGMA journal_mode=WAL")
-        
+# ========== 连接管理 ==========
+# 每个工作线程持有一个独立的读连接 (WAL 下读连接互不阻塞，无需全局锁)，
+# 写操作统一走单个写连接，由锁串行化并使用 BEGIN IMMEDIATE 事务。
+_tls = threading.local()
+_writer_conn = None
+_writer_lock = threading.Lock()
+
+def _open_conn(readonly=True):
+    """创建并配置 SQLite 连接"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA page_size=4096")  # 仅在新库首次写入前生效
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=536870912")  # 512 MB 内存映射读
+    conn.execute("PRAGMA busy_timeout=5000")
+    if readonly:
+        conn.execute("PRAGMA query_only=1")
+    return conn
+
+@contextmanager
+def get_db_connection(readonly=True):
+    """获取数据库连接 (读: 线程本地连接; 写: 全局写连接 + 立即事务)"""
+    global _writer_conn
+    if readonly:
+        conn = getattr(_tls, "ro", None)
+        if conn is None:
+            conn = _tls.ro = _open_conn()
+        yield conn
+        return
+
+    with _writer_lock:
+        if _writer_conn is None:
+            _writer_conn = _open_conn(readonly=False)
+            _writer_conn.isolation_level = None  # 手动管理事务
+        _writer_conn.execute("BEGIN IMMEDIATE")
         try:
-            yield conn
-        finally:
-            with self.lock:
-                if len(self.connections) < self.pool_size:
-                    self.connections.append(conn)
-                else:
-                    conn.close()
-
-# 创建全局连接池
-_pool = ConnectionPool(DB_PATH, pool_size=5)
-
-def get_db_connection():
-    """获取数据库连接"""
-    return _pool.get_connection()
+            yield _writer_conn
+            _writer_conn.execute("COMMIT")
+        except BaseException:
+            _writer_conn.execute("ROLLBACK")
+            raise
 
 # ========== 缓存实现 ==========
 
@@ -159,6 +210,34 @@ def get_law_by_id_cached(law_id: int):
         """, (law_id,))
         return cursor.fetchone()
 
+def _glob_prefix(text: str) -> str:
+    """
+    构造前缀匹配的 GLOB 模式 (转义通配符)。
+    title 列为 BINARY 排序，LIKE 默认大小写不敏感无法走索引；
+    GLOB 区分大小写，可被改写为 title 索引上的范围扫描。
+    """
+    return re.sub(r'([*?\[])', r'[\1]', text) + '*'
+
+@lru_cache(maxsize=2048)
+def _resolve_law_by_like(law_title: str):
+    """
+    标题模糊匹配(带缓存，含未命中结果)
+    返回: (id, title, status, publish_date) 或 None
+    先走前缀匹配 (可用 title 索引)，未命中再退回全表子串匹配。
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        for op, pattern in (("GLOB", _glob_prefix(law_title)), ("LIKE", f"%{law_title}%")):
+            cursor.execute(
+                "SELECT id, title, status, publish_date FROM laws "
+                f"WHERE title {op} ? ORDER BY publish_date DESC LIMIT 1",
+                (pattern,)
+            )
+            row = cursor.fetchone()
+            if row:
+                return tuple(row)
+        return None
+
 # ========== 概念检索实现 ==========
 
 @lru_cache(maxsize=500)
@@ -172,19 +251,18 @@ def resolve_concept_cached(query: str):
         results = []
 
         # 尝试匹配的候选词列表 (优先完整查询, 然后子短语, 最后单个词)
-        candidates = [query]
+        # dict.fromkeys 作为有序去重集合，避免 list 线性查重
         tokens = query.split()
-        if len(tokens) > 1:
-            # 添加所有连续子短语 (从长到短)
-            for length in range(len(tokens) - 1, 0, -1):
-                for start in range(len(tokens) - length + 1):
-                    sub = "".join(tokens[start:start + length])
-                    if sub != query:
-                        candidates.append(sub)
-            # 添加单个词
-            for t in tokens:
-                if t not in candidates:
-                    candidates.append(t)
+        n = len(tokens)
+        candidates = list(dict.fromkeys([
+            query,
+            # 所有连续子短语 (从长到短)
+            *("".join(tokens[s:s + length])
+              for length in range(n - 1, 0, -1)
+              for s in range(n - length + 1)),
+            # 单个词
+            *tokens,
+        ]))
 
         for candidate in candidates:
             # 1. 直接匹配 law_topics
@@ -248,7 +326,6 @@ def _extract_articles_by_hints(content, hints_str):
         return ""
 
     # 解析 hints: "第535-537条", "第538条,第540条", "第535-537条,第538-542条"
-    import re as _re
     target_nums = set()
     for part in hints_str.replace("，", ",").split(","):
         part = part.strip().replace("第", "").replace("条", "")
@@ -271,14 +348,13 @@ def _extract_articles_by_hints(content, hints_str):
     # 将数字转为中文条号匹配
     articles_text = []
     # 按"第X条"拆分正文
-    splits = _re.split(r'(第[零一二三四五六七八九十百千万]+条)', content)
+    splits = _ARTICLE_SPLIT_RE.split(content)
     for i in range(1, len(splits), 2):
         article_num_str = splits[i]  # "第五百三十五条"
         body = splits[i + 1] if i + 1 < len(splits) else ""
         # 将中文条号转数字 (复用 article_splitter.cn2an_convert)
         try:
-            from article_splitter import cn2an_convert
-            num = cn2an_convert(article_num_str.replace("第", "").replace("条", ""))
+            num = _cn2an_convert(article_num_str.replace("第", "").replace("条", ""))
         except Exception:
             num = 0
         if num in target_nums:
@@ -309,7 +385,7 @@ def _extract_articles_by_keyword(content, keyword, max_articles=8):
                 match_terms.append(sub)
 
     articles_text = []
-    splits = re.split(r'(第[零一二三四五六七八九十百千万]+条)', content)
+    splits = _ARTICLE_SPLIT_RE.split(content)
     for i in range(1, len(splits), 2):
         article_num_str = splits[i]
         body = splits[i + 1] if i + 1 < len(splits) else ""
@@ -368,6 +444,26 @@ def format_concept_results(concept_hits, query, limit=15, inline_articles=True):
 
     return f"🔍 概念检索 '{query}' 命中 {len(entries)} 部法律:\n\n" + "\n\n".join(entries)
 
+# 向量命中回查 SQL: IN 子句按 2 的幂固定宽度 (不足以 0 补齐，id 从 1 开始)，
+# 使不同命中数复用同一条已编译语句
+_VEC_ENRICH_SQL = {}
+
+def _vec_enrich_query(vec_ids):
+    """返回 (sql, params)，params 已补齐到分桶宽度"""
+    size = 8
+    while size < len(vec_ids):
+        size *= 2
+    sql = _VEC_ENRICH_SQL.get(size)
+    if sql is None:
+        sql = _VEC_ENRICH_SQL[size] = f"""
+            SELECT la.id, la.law_id, l.title, l.publish_date, l.category, l.status,
+                   substr(la.content, 1, 100) as snippet
+            FROM law_articles la
+            JOIN laws l ON la.law_id = l.id
+            WHERE la.id IN ({",".join("?" * size)})
+        """
+    return sql, list(vec_ids) + [0] * (size - len(vec_ids))
+
 # ========== MCP工具函数 ==========
 
 @mcp.tool()
@@ -426,9 +522,14 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
             logger.warning(f"FTS Direct search failed: {e}")
             results = []
 
-        # 中文智能分词 (用于后续 AND/OR/LIKE 搜索)
-        if " " not in query and any("\u4e00" <= c <= "\u9fff" for c in query):
-            tokens = jieba.lcut_for_search(query)
+        # 快速路径: FTS 精确短语已填满 limit，跳过后续降级与向量检索
+        fts_filled = len(results) >= limit
+
+        # 中文智能分词 (用于后续 AND/OR/LIKE 搜索，已有结果时这些阶段都不会执行)
+        if results:
+            tokens = []
+        elif " " not in query and _HAS_CJK(query) is not None:
+            tokens = _tokenize_cached(query)
             tokens = [t for t in tokens if len(t) >= 2]  # 过滤单字
             if not tokens:
                 tokens = [query]
@@ -461,7 +562,10 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
             cursor = conn.cursor()
 
             # 3a. 构造 AND 查询 (所有词都必须出现)
-            sql_title = "SELECT l.id, l.title, l.publish_date, l.category, l.status FROM laws l WHERE 1=1"
+            sql_title = (
+                "SELECT l.id, l.title, l.publish_date, l.category, l.status, "
+                "substr(l.content, 1, 100) AS snippet FROM laws l WHERE 1=1"
+            )
             params_title = []
             for term in tokens:
                 sql_title += " AND l.title LIKE ?"
@@ -477,14 +581,17 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
             # 3b. 如果标题没匹配到，匹配正文
             rows_content = []
             if not rows_title:
-                 sql_content = "SELECT l.id, l.title, l.publish_date, l.category, l.status FROM laws l WHERE 1=1"
+                 sql_content = (
+                     "SELECT l.id, l.title, l.publish_date, l.category, l.status, "
+                     "substr(l.content, 1, 100) AS snippet FROM laws l WHERE 1=1"
+                 )
                  params_content = []
                  for term in tokens:
                      sql_content += " AND l.content LIKE ?"
                      params_content.append(f"%{term}%")
 
                  # 增加民法典权重
-                 sql_content += " ORDER BY CASE WHEN l.title LIKE '%民法典%' THEN 0 ELSE 1 END, l.publish_date DESC LIMIT ?"
+                 sql_content += " ORDER BY CASE WHEN instr(l.title, '民法典') THEN 0 ELSE 1 END, l.publish_date DESC LIMIT ?"
                  params_content.append(limit)
 
                  try:
@@ -502,7 +609,11 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             fts_query_or = " OR ".join([f'"{t}"' for t in tokens])
-            sql = "SELECT l.id, l.title, l.publish_date, l.category, l.status, bm.rank FROM laws_fts bm JOIN laws l ON l.id = bm.rowid WHERE laws_fts MATCH ?"
+            sql = (
+                "SELECT l.id, l.title, l.publish_date, l.category, l.status, "
+                "snippet(laws_fts, 1, '<b>', '</b>', '...', 64) AS snippet "
+                "FROM laws_fts bm JOIN laws l ON l.id = bm.rowid WHERE laws_fts MATCH ?"
+            )
             params = [fts_query_or]
             
             if category: sql += " AND l.category = ?"; params.append(category)
@@ -521,40 +632,28 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
     input_results_count = len(results) + len(fallback_results)
     vector_results = []
     
-    if vdb and (input_results_count < limit or len(query) > 4):
-        # 等待预加载完成（最多 25s），避免与预加载线程竞争
+    if vdb and not fts_filled and (
+        input_results_count < max(5, limit // 2)
+        or (_AGGRESSIVE_SEMANTIC and len(query) > 4)
+    ):
+        # 等待预加载完成（最多 15s），避免与预加载线程竞争
         _vector_ready.wait(timeout=15.0)
 
-        search_result_holder = {"hits": []}
-
-        def _run_vector_search():
-            try:
-                idx = get_vector_index(str(DB_PATH))
-                search_result_holder["hits"] = idx.search(query, limit=5)
-            except Exception as e:
-                logger.error(f"Vector search inner failed: {e}")
-
-        t = threading.Thread(target=_run_vector_search)
-        t.start()
-        t.join(timeout=10.0)  # 10s timeout for vector search
-
-        if t.is_alive():
+        vec_hits = []
+        future = _VEC_POOL.submit(lambda: _vec_idx().search(query, limit=5))
+        try:
+            vec_hits = future.result(timeout=10.0)  # 10s timeout for vector search
+        except FutureTimeout:
             logger.warning(f"Vector search timed out for query: {query}")
-        
-        vec_hits = search_result_holder["hits"]
+        except Exception as e:
+            logger.error(f"Vector search inner failed: {e}")
+
         if vec_hits:
                 # VectorIndex.search 返回: [{'article_id': int, 'score': float, 'raw_score': float}]
                 vec_ids = [h['article_id'] for h in vec_hits]
-                placeholders = ",".join(["?" for _ in vec_ids])
                 with get_db_connection() as conn:
                     cur = conn.cursor()
-                    cur.execute(f"""
-                        SELECT la.id, la.law_id, l.title, l.publish_date, l.category, l.status,
-                               substr(la.content, 1, 100) as snippet
-                        FROM law_articles la
-                        JOIN laws l ON la.law_id = l.id
-                        WHERE la.id IN ({placeholders})
-                    """, vec_ids)
+                    cur.execute(*_vec_enrich_query(vec_ids))
                     rows_map = {r[0]: r[1:] for r in cur.fetchall()}
                 
                 for hit in vec_hits:
@@ -562,10 +661,10 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
                     if aid in rows_map:
                         law_id, title, date, cat, status, snippet = rows_map[aid]
                         snippet_clean = snippet.replace('\n', ' ') + "..."
-                        vector_results.append((
-                            law_id, title, date, cat, status,
-                            f"[语义匹配 {hit['score']:.2f}] {snippet_clean}"
-                        ))
+                        vector_results.append({
+                            'id': law_id, 'title': title, 'status': status,
+                            'snippet': f"[语义匹配 {hit['score']:.2f}] {snippet_clean}",
+                        })
 
 
     # 格式化输出
@@ -576,25 +675,14 @@ def search_laws(query: str, category: str = None, status: str = "有效", limit:
 
     def add_rows(rows, source_label=""):
         for r in rows:
-            # r 结构可能不同:
-            # FTS: (id, title, date, cat, status, snippet) — 6列
-            # Fallback: (id, title, date, cat, status) — 5列
-            # Vector: (id, title, date, cat, status, snippet) — 6列
-            law_id = r[0]
+            # 所有来源统一投影 (id, title, publish_date, category, status, snippet)
+            law_id = r['id']
             if law_id in seen_ids: continue
             seen_ids.add(law_id)
 
-            title = r[1]
-            status_str = r[4] if len(r) > 4 else "未知"
-            snippet = ""
-
-            if len(r) > 5:  # FTS or Vector with snippet
-                snippet = r[5]
-                if isinstance(snippet, (int, float)): snippet = ""
-
-            entry = f"📄 {title} ({status_str})"
-            if snippet and isinstance(snippet, str):
-                entry += f"\n   摘要: {snippet}"
+            entry = f"📄 {r['title']} ({r['status']})"
+            if r['snippet']:
+                entry += f"\n   摘要: {r['snippet']}"
 
             # 当有概念命中时，按需获取 content 并提取相关条文
             if concept_hits:
@@ -701,33 +789,51 @@ def _get_sibling_articles(law_id, article_int, conn):
         return ""
 
 
-def _expand_synonyms(keyword: str, conn) -> list:
-    """查询 search_synonyms 表，返回关键词的所有同义词（含自身）。
+# 同义词缓存: 词 → 同义词元组 (含自身)，按 token 批量预取
+_SYNONYM_CACHE = {}
+_SYNONYM_CACHE_MAX = 8192
+
+def _synonyms_for(tokens) -> dict:
+    """查询 search_synonyms 表，返回 {词: 同义词元组(含自身)}。
     
-    示例: _expand_synonyms('股权') → ['股权', '出资额', '股份', '持股', '股东权益']
+    未缓存的词合并为一次 IN 查询加载，已缓存的词不访问数据库。
+    示例: _synonyms_for(['股权'])['股权'] → ('股权', '出资额', '股份', '持股', '股东权益')
     """
-    try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s2.word FROM search_synonyms s1
-            JOIN search_synonyms s2 ON s1.group_id = s2.group_id
-            WHERE s1.word = ?
-        """, (keyword,))
-        results = [r[0] for r in cursor.fetchall()]
-        return results if results else [keyword]
-    except Exception:
-        return [keyword]
+    missing = [t for t in dict.fromkeys(tokens) if t not in _SYNONYM_CACHE]
+    if missing:
+        found = {}
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT s1.word, s2.word FROM search_synonyms s1
+                    JOIN search_synonyms s2 ON s1.group_id = s2.group_id
+                    WHERE s1.word IN ({",".join("?" * len(missing))})
+                """, missing)
+                for word, syn in cursor.fetchall():
+                    found.setdefault(word, []).append(syn)
+        except Exception as e:
+            # 查询失败 (如数据库被锁) 时本次退化为无同义词，且不写入缓存，下次重试
+            logger.warning(f"Synonym lookup failed: {e}")
+            return {t: _SYNONYM_CACHE.get(t, (t,)) for t in tokens}
+        if len(_SYNONYM_CACHE) + len(missing) > _SYNONYM_CACHE_MAX:
+            _SYNONYM_CACHE.clear()
+        for t in missing:
+            _SYNONYM_CACHE[t] = tuple(found.get(t, ())) or (t,)
+    return {t: _SYNONYM_CACHE.get(t, (t,)) for t in tokens}
 
 
-def _build_fts_query_with_synonyms(tokens: list, conn) -> str:
+def _build_fts_query_with_synonyms(tokens: list, synonyms_map: dict = None) -> str:
     """为每个关键词扩展同义词，构造 FTS5 AND 查询。
     
     示例: tokens=['离婚', '股权'] →
       '"离婚" AND ("股权" OR "出资额" OR "股份" OR "持股" OR "股东权益")'
     """
+    if synonyms_map is None:
+        synonyms_map = _synonyms_for(tokens)
     parts = []
     for token in tokens:
-        synonyms = _expand_synonyms(token, conn)
+        synonyms = synonyms_map[token]
         if len(synonyms) > 1:
             or_clause = " OR ".join([f'"{s}"' for s in synonyms])
             parts.append(f"({or_clause})")
@@ -740,7 +846,7 @@ def _parse_article_number_input(article_number: str) -> int:
     """将用户输入的条号解析为整数。支持 '1023', '第1023条', '第一千零二十三条' 等格式。"""
     cleaned = article_number.replace("第", "").replace("条", "").strip()
     # 去除 "之一" 等后缀
-    suffix_match = re.match(r'^(.+?)(之[一二三四五六七八九十]+)?$', cleaned)
+    suffix_match = _ARTICLE_SUFFIX_RE.match(cleaned)
     if suffix_match:
         cleaned = suffix_match.group(1)
 
@@ -749,8 +855,7 @@ def _parse_article_number_input(article_number: str) -> int:
 
     # 中文数字转换
     try:
-        from article_splitter import cn2an_convert
-        return cn2an_convert(cleaned)
+        return _cn2an_convert(cleaned)
     except Exception:
         return 0
 
@@ -780,18 +885,16 @@ def get_article(law_title: str, article_number: str):
                 (law_title,)
             )
             row = cursor.fetchone()
-            # 再 LIKE 模糊匹配
-            if not row:
-                cursor.execute(
-                    "SELECT id, title, publish_date, status FROM laws "
-                    "WHERE title LIKE ? ORDER BY publish_date DESC LIMIT 1",
-                    (f"%{law_title}%",)
-                )
-                row = cursor.fetchone()
-            if not row:
-                return f"未找到法律: {law_title}"
-            law_id = row[0]
-            law_info = row[1:]
+            if row:
+                law_id = row[0]
+                law_info = row[1:]
+            else:
+                # 再 LIKE 模糊匹配
+                like_match = _resolve_law_by_like(law_title)
+                if not like_match:
+                    return f"未找到法律: {law_title}"
+                law_id, like_title, like_status, like_date = like_match
+                law_info = (like_title, like_date, like_status)
 
         if not law_info:
             return f"未找到法律: {law_title}"
@@ -853,9 +956,8 @@ def get_article(law_title: str, article_number: str):
             
             # 尝试为模糊匹配结果添加关联推荐
             try:
-                import article_splitter
                 # 尝试从 res[1] (e.g. "五百三十八") 转换回数字
-                ref_int = article_splitter.cn2an_convert(res[1])
+                ref_int = _cn2an_convert(res[1])
                 
                 if ref_int > 0:
                     siblings = _get_sibling_articles(law_id, ref_int, conn)
@@ -872,105 +974,117 @@ def get_article(law_title: str, article_number: str):
 
         return f"在《{real_title}》中未找到条文: {article_number}"
 
-@mcp.tool()
-
-def search_article_content(keywords: str, limit: int = 10):
-    """直接在法条内容中搜索关键词。支持概念搜索，自动扩展同义词。"""
-    
-    internal_limit = 50 # Fetch more candidates for RRF merging
+_HINT_RANGE_MAX = 100     # 单个范围提示最多展开的条数
+_CONCEPT_MAX_PAIRS = 500  # 单次概念查询最多核对的 (law_id, 条号) 对
 
-    
-    # 1. 概念检索 (Concept Search)
+def _parse_hints(hints: str) -> list:
+    """
+    解析条文提示为有序条号列表: "538", "538-542", "12,15"
+    每个范围最多展开 _HINT_RANGE_MAX 条，无法解析的片段忽略。
+    """
+    out = set()
+    for p in hints.replace("，", ",").split(","):
+        p = p.strip()
+        try:
+            if "-" in p:
+                start, end = map(int, p.split("-"))
+                out.update(range(start, min(start + _HINT_RANGE_MAX, end + 1)))
+            elif p:
+                out.add(int(p))
+        except ValueError:
+            pass
+    return sorted(out)
+
+def _concept_stage(cursor, keywords):
+    """概念检索: 将 law_topics 命中的条文提示转换为标准的 article rows"""
     concept_results = []
     try:
         concept_hits = resolve_concept_cached(keywords)
         if concept_hits:
             # concept_hits: list of (topic, law_title, law_id, article_hints, relevance)
-            # 需要将其转换为标准的 article rows
-            with get_db_connection() as conn:
-                c_concept = conn.cursor()
-                for topic, law_title, law_id, hints, relevance in concept_hits:
-                    # 解析 hints: "538", "538-542", "12,15"
-                    # 简单支持单号和范围
-                    target_articles = []
-                    parts = hints.replace("，", ",").split(",")
-                    for p in parts:
-                        p = p.strip()
-                        if "-" in p:
-                            try:
-                                start, end = map(int, p.split("-"))
-                                target_articles.extend(range(start, end + 1))
-                            except:
-                                pass
-                        else:
-                            try:
-                                target_articles.append(int(p))
-                            except:
-                                pass
-                    
-                    if target_articles:
-                         placeholders = ",".join(["?" for _ in target_articles])
-                         # 查询 law_articles
-                         sql_concept = f"""
-                            SELECT la.article_number_str, la.content, la.chapter_path,
-                                   l.title, l.publish_date, l.status
-                            FROM law_articles la
-                            JOIN laws l ON la.law_id = l.id
-                            WHERE la.law_id = ? 
-                              AND la.article_number_int IN ({placeholders})
-                              AND l.status = '有效'
-                         """
-                         params = [law_id] + target_articles
-                         c_concept.execute(sql_concept, params)
-                         rows = c_concept.fetchall()
-                         concept_results.extend(rows)
-            
-            logger.info(f"概念检索命中: {len(concept_results)} 条文")
-    except Exception as e:
-        logger.error(f"概念检索出错: {e}")
-
-    # 2. FTS 全文检索 (Text Search)
-    fts_results = []
-    
-    # E2: Query Expansion
-    expanded_keywords = expand_query(keywords)
-    if expanded_keywords != keywords:
-        logger.info(f"Article Search Expanded: {keywords} -> {expanded_keywords}")
-    
-    # Strategy A: Direct FTS with Expanded Query (if it contains OR syntax)
-    if expanded_keywords != keywords and " OR " in expanded_keywords:
-        try:
-            with get_db_connection() as conn:
-                c = conn.cursor()
-                sql_direct = """
+            # 先解析全部 hints 为 (law_id, 条号) 对，再一次性 JOIN 查询
+            pairs = []
+            for topic, law_title, law_id, hints, relevance in concept_hits:
+                pairs.extend((law_id, n) for n in _parse_hints(hints))
+
+            pairs = list(dict.fromkeys(pairs))[:_CONCEPT_MAX_PAIRS]
+            if pairs:
+                # ord 保持概念命中顺序 (相关度降序)，供 RRF 排名使用
+                values = ",".join(["(?,?,?)"] * len(pairs))
+                sql_concept = f"""
+                    WITH t(ord, law_id, num) AS (VALUES {values})
                     SELECT la.article_number_str, la.content, la.chapter_path,
                            l.title, l.publish_date, l.status
-                    FROM law_articles_fts fts
-                    JOIN law_articles la ON fts.rowid = la.id
+                    FROM t
+                    JOIN law_articles la
+                      ON la.law_id = t.law_id AND la.article_number_int = t.num
                     JOIN laws l ON la.law_id = l.id
-                    WHERE law_articles_fts MATCH ? 
-                      AND l.status = '有效'
-                    ORDER BY bm25(law_articles_fts)
-                    LIMIT ?
+                    WHERE l.status = '有效'
+                    ORDER BY t.ord, la.id
                 """
-                c.execute(sql_direct, (expanded_keywords, internal_limit))
-                fts_results = c.fetchall()
-        except Exception as e:
-            logger.error(f"Expanded FTS failed: {e}")
+                params = [v for i, (lid, n) in enumerate(pairs) for v in (i, lid, n)]
+                cursor.execute(sql_concept, params)
+                concept_results = cursor.fetchall()
 
-    # Strategy B: Original Token-based Logic (Fallback if Strategy A failed or skipped)
-    if not fts_results:
+            logger.info(f"概念检索命中: {len(concept_results)} 条文")
+    except Exception as e:
+        logger.error(f"概念检索出错: {e}")
+    return concept_results
+
+
+# LIKE 兜底最多使用 8 个词: 更多的词对召回几乎没有帮助，
+# 且限定 SQL 形态数量，使语句缓存可以复用已编译的语句
+_LIKE_MAX_TERMS = 8
+_LIKE_FALLBACK_SQL = {}
+
+def _like_fallback_sql(n_terms):
+    """返回含 n_terms 个 content LIKE 条件的兜底 SQL (按词数缓存)"""
+    sql = _LIKE_FALLBACK_SQL.get(n_terms)
+    if sql is None:
+        sql = _LIKE_FALLBACK_SQL[n_terms] = (
+            """
+            SELECT la.article_number_str, la.content, la.chapter_path,
+                   l.title, l.publish_date, l.status
+            FROM law_articles la
+            JOIN laws l ON la.law_id = l.id
+            WHERE l.status = '有效'
+            """
+            + " AND la.content LIKE ?" * n_terms
+            + " ORDER BY CASE WHEN instr(l.title, '民法典') THEN 0 WHEN instr(l.title, '刑法') THEN 1 ELSE 2 END LIMIT ?"
+        )
+    return sql
+
+
+@lru_cache(maxsize=1)
+def _articles_fts_is_trigram():
+    """law_articles_fts 是否使用 trigram 分词器"""
+    try:
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 智能分词
-            if " " not in keywords and any("\u4e00" <= char <= "\u9fff" for char in keywords):
-                tokens = jieba.lcut_for_search(keywords)
-            else:
-                tokens = keywords.split()
+            row = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'law_articles_fts'"
+            ).fetchone()
+        return bool(row and row[0] and "trigram" in row[0].lower())
+    except Exception:
+        return False
+
 
-            # SQL 模板
-            sql = """
+def _or_query_terms(query):
+    """拆出 expand_query 生成的 '"A" OR "B"' 查询中的词集合"""
+    return {t.strip().strip('"') for t in query.split(" OR ")}
+
+
+def _fts_stage(cursor, keywords, expanded_keywords, internal_limit):
+    """
+    FTS 全文检索: Strategy A (扩展查询) → Strategy B (分词 AND/OR) → D (LIKE 兜底)
+    返回: (rows, 是否由多词 AND 查询命中)
+    """
+    fts_results = []
+
+    # Strategy A: Direct FTS with Expanded Query (if it contains OR syntax)
+    strategy_a_ran_with_or = expanded_keywords != keywords and " OR " in expanded_keywords
+    if strategy_a_ran_with_or:
+        try:
+            sql_direct = """
                 SELECT la.article_number_str, la.content, la.chapter_path,
                        l.title, l.publish_date, l.status
                 FROM law_articles_fts fts
@@ -981,119 +1095,225 @@ def search_article_content(keywords: str, limit: int = 10):
                 ORDER BY bm25(law_articles_fts)
                 LIMIT ?
             """
+            cursor.execute(sql_direct, (expanded_keywords, internal_limit))
+            fts_results = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Expanded FTS failed: {e}")
 
-            # 尝试不同宽度的 FTS 查询
-            queries = []
-            # B1. FTS AND + 同义词 (最严)
-            queries.append(_build_fts_query_with_synonyms(tokens, conn))
-            
-            # B2. FTS AND (无同义词)
-            if len(tokens) > 1:
-                queries.append(" AND ".join([f'"{t}"' for t in tokens]))
-            
-            # B3. FTS OR (兜底)
-            all_terms = []
-            for t in tokens:
-                all_terms.extend(_expand_synonyms(t, conn))
-            queries.append(" OR ".join([f'"{t}"' for t in all_terms]))
+    if fts_results:
+        return fts_results, False
 
-            for q in queries:
-                try:
-                    cursor.execute(sql, (q, internal_limit))
-                    res = cursor.fetchall()
-                    if res:
-                        fts_results = res
-                        break # 只要一种策略有结果就采纳
-                except Exception as e:
-                    logger.warning(f"FTS Strategy B failed for query '{q}': {e}")
-                    continue
-                    
-            # D. LIKE 兜底 (针对 FTS 短词问题)
-            if not fts_results and len(tokens) >= 1:
-                like_sql = """
-                    SELECT la.article_number_str, la.content, la.chapter_path,
-                           l.title, l.publish_date, l.status
-                    FROM law_articles la
-                    JOIN laws l ON la.law_id = l.id
-                    WHERE l.status = '有效'
-                """
-                like_params = []
-                for t in tokens:
-                    if len(t) >= 2:  # 忽略单字
-                        like_sql += " AND la.content LIKE ?"
-                        like_params.append(f"%{t}%")
-                if like_params:
-                    like_sql += " ORDER BY CASE WHEN l.title LIKE '%民法典%' THEN 0 WHEN l.title LIKE '%刑法%' THEN 1 ELSE 2 END LIMIT ?"
-                    like_params.append(internal_limit)
-                    try:
-                        cursor.execute(like_sql, like_params)
-                        fts_results = cursor.fetchall()
-                    except Exception as e:
-                        logger.warning(f"LIKE fallback search failed: {e}")
-                        pass
-
-    # 3. 向量检索 (Vector Search) — 带超时保护
-    vec_results = []
-    vec_hits = []
-    if vdb:
-        # 等待预加载完成（最多 25s），避免与预加载线程竞争
-        _vector_ready.wait(timeout=15.0)
+    # Strategy B: Original Token-based Logic (Fallback if Strategy A failed or skipped)
+    # 智能分词
+    if " " not in keywords and _HAS_CJK(keywords) is not None:
+        tokens = list(_tokenize_cached(keywords))
+    else:
+        tokens = keywords.split()
+
+    # SQL 模板
+    sql = """
+        SELECT la.article_number_str, la.content, la.chapter_path,
+               l.title, l.publish_date, l.status
+        FROM law_articles_fts fts
+        JOIN law_articles la ON fts.rowid = la.id
+        JOIN laws l ON la.law_id = l.id
+        WHERE law_articles_fts MATCH ? 
+          AND l.status = '有效'
+        ORDER BY bm25(law_articles_fts)
+        LIMIT ?
+    """
 
-        vec_hit_holder = {"hits": []}
-        def _run_article_vec_search():
-            try:
-                idx = get_vector_index(str(DB_PATH))
-                vec_hit_holder["hits"] = idx.search(keywords, limit=internal_limit)
-            except Exception as e:
-                logger.error(f"Vector search inner failed: {e}")
+    # 尝试不同宽度的 FTS 查询: (query, 是否为多词 AND, 是否为 B3 OR 兜底)
+    queries = []
+    multi = len(tokens) > 1
+    # 一次性预取全部 token 的同义词，B1/B3 均复用
+    synonyms_map = _synonyms_for(tokens)
+
+    # B2. FTS AND (无同义词，多词时最有选择性，候选集最小，先试)
+    if multi:
+        queries.append((" AND ".join([f'"{t}"' for t in tokens]), True, False))
+
+    # B1. FTS AND + 同义词
+    queries.append((_build_fts_query_with_synonyms(tokens, synonyms_map), multi, False))
+
+    # B3. FTS OR (兜底)
+    # 仅当 Strategy A 的 OR 扩展查询已包含 B3 的全部词时 (A 为空则 B3 必为空) 才跳过
+    all_terms = []
+    for t in tokens:
+        all_terms.extend(synonyms_map[t])
+    if not (strategy_a_ran_with_or and set(all_terms) <= _or_query_terms(expanded_keywords)):
+        queries.append((" OR ".join([f'"{t}"' for t in all_terms]), False, True))
+
+    b3_ran = False
+    for q, is_and, is_b3 in queries:
+        try:
+            cursor.execute(sql, (q, internal_limit))
+            res = cursor.fetchall()
+            if res:
+                return res, is_and  # 只要一种策略有结果就采纳
+            b3_ran = b3_ran or is_b3
+        except Exception as e:
+            logger.warning(f"FTS Strategy B failed for query '{q}': {e}")
+            continue
+
+    # D. LIKE 兜底 (针对 FTS 短词问题)
+    # trigram 下若 B3 (全部词 OR) 已执行且所有词均 ≥3 字，LIKE 命中的条文必含某个词，
+    # B3 为空则 LIKE 也必为空，可跳过全表扫描；含 1~2 字词时 trigram 无法匹配，仍需 LIKE
+    like_terms = [t for t in tokens if len(t) >= 2][:_LIKE_MAX_TERMS]  # 忽略单字
+    like_covered = b3_ran and _articles_fts_is_trigram() and all(len(t) >= 3 for t in tokens)
+    if like_terms and not like_covered:
+        like_params = [f"%{t}%" for t in like_terms]
+        like_params.append(internal_limit)
+        try:
+            cursor.execute(_like_fallback_sql(len(like_terms)), like_params)
+            fts_results = cursor.fetchall()
+        except Exception as e:
+            logger.warning(f"LIKE fallback search failed: {e}")
 
-        vt = threading.Thread(target=_run_article_vec_search)
-        vt.start()
-        vt.join(timeout=10.0)  # 10s timeout，预加载完成后实际只需 <1s
+    return fts_results, False
 
-        if vt.is_alive():
-            logger.warning(f"search_article_content vector search timed out: {keywords}")
-        else:
-            vec_hits = vec_hit_holder["hits"]
 
+def _vec_stage(keywords, internal_limit):
+    """向量检索，并回查命中条文"""
+    if not vdb:
+        return []
+
+    try:
+        vec_hits = _vec_idx().search(keywords, limit=internal_limit)
+    except Exception as e:
+        logger.error(f"Vector search inner failed: {e}")
+        return []
+    return _run_with_cursor(_vec_postfetch, vec_hits)
+
+
+def _vec_postfetch(cursor, vec_hits):
+    """按向量命中顺序回查条文行"""
+    vec_results = []
     try:
         if vec_hits:
             vec_ids = [h['article_id'] for h in vec_hits]
             if vec_ids:
                 placeholders = ",".join(["?" for _ in vec_ids])
-                with get_db_connection() as conn:
-                    c2 = conn.cursor()
-                    c2.execute(f"""
-                        SELECT la.id, la.article_number_str, la.content, la.chapter_path,
-                            l.title, l.publish_date, l.status
-                        FROM law_articles la
-                        JOIN laws l ON la.law_id = l.id
-                        WHERE la.id IN ({placeholders})
-                        AND l.status = '有效'
-                    """, vec_ids)
-                    rows_map = {r[0]: r[1:] for r in c2.fetchall()}
-
-                for hit in vec_hits:
-                    aid = hit['article_id']
-                    if aid in rows_map:
-                        row = rows_map[aid]
-                        score = hit['score']
-                        vec_results.append({
-                            'row': row,
-                            'score': score
-                        })
-                
-                vec_results = [x['row'] for x in vec_results]
+                cursor.execute(f"""
+                    SELECT la.id, la.article_number_str, la.content, la.chapter_path,
+                        l.title, l.publish_date, l.status
+                    FROM law_articles la
+                    JOIN laws l ON la.law_id = l.id
+                    WHERE la.id IN ({placeholders})
+                    AND l.status = '有效'
+                """, vec_ids)
+                rows_map = {r[0]: r[1:] for r in cursor.fetchall()}
+                # 保持向量命中顺序 (RRF 仅使用排名，无需保留分数)
+                vec_results = [rows_map[aid] for aid in vec_ids if aid in rows_map]
 
     except Exception as e:
         logger.debug(f"Vector search post-processing failed: {e}")
+    return vec_results
+
+
+# 检索阶段线程池 (常驻线程，各自复用线程本地读连接)
+_STAGE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-stage")
+_STAGE_TIMEOUT = 10.0  # 秒，一次检索各阶段共用的总时限
+
+
+def _run_with_cursor(stage, *args):
+    """在当前线程的读连接上执行检索阶段"""
+    with get_db_connection() as conn:
+        return stage(conn.cursor(), *args)
+
+
+def _stage_result(future, name, deadline):
+    """在各阶段共用的截止时间前收集结果，返回 (结果, 是否正常完成)；超时或出错时结果为空列表"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic())), True
+    except FutureTimeout:
+        future.cancel()  # 尚在排队的阶段不再占用线程池
+        logger.warning(f"search_article_content {name} stage timed out")
+    except Exception as e:
+        logger.error(f"search_article_content {name} stage failed: {e}")
+    return [], False
+
+
+# search_article_content 结果缓存: (keywords, limit) → (写入时间, 结果)，LRU + TTL
+_SEARCH_CACHE = OrderedDict()
+_SEARCH_CACHE_MAX = 512
+_SEARCH_TTL = 300.0  # 秒
+_search_cache_lock = threading.Lock()
+
+
+@mcp.tool()
+def search_article_content(keywords: str, limit: int = 10):
+    """直接在法条内容中搜索关键词。支持概念搜索，自动扩展同义词。"""
+    keywords = keywords.strip()
+    key = (keywords, limit)
+    now = time.monotonic()
+    with _search_cache_lock:
+        hit = _SEARCH_CACHE.get(key)
+        if hit and now - hit[0] < _SEARCH_TTL:
+            _SEARCH_CACHE.move_to_end(key)
+            return hit[1]
+
+    result, complete = _search_article_content(keywords, limit)
+    # 降级结果 (向量索引预加载中 / 某阶段超时或出错) 不缓存，下次重新检索
+    if not complete:
+        return result
+
+    with _search_cache_lock:
+        _SEARCH_CACHE[key] = (now, result)
+        _SEARCH_CACHE.move_to_end(key)
+        if len(_SEARCH_CACHE) > _SEARCH_CACHE_MAX:
+            _SEARCH_CACHE.popitem(last=False)
+    return result
+
+
+def _search_article_content(keywords, limit):
+    """
+    search_article_content 的实际检索逻辑 (概念 + FTS + 向量，RRF 融合)
+    返回: (结果文本, 各检索阶段是否均已正常完成)
+    """
+    internal_limit = 50 # Fetch more candidates for RRF merging
+
+    # E2: Query Expansion
+    expanded_keywords = expand_query(keywords)
+    if expanded_keywords != keywords:
+        logger.info(f"Article Search Expanded: {keywords} -> {expanded_keywords}")
+
+    # 三路检索互相独立，并行执行: 总耗时 ≈ max(概念, FTS, 向量)，最多 _STAGE_TIMEOUT 秒
+    deadline = time.monotonic() + _STAGE_TIMEOUT
+    # 1. 概念检索 (Concept Search)
+    f_concept = _STAGE_POOL.submit(_run_with_cursor, _concept_stage, keywords)
+    # 2. FTS 全文检索 (Text Search)
+    f_fts = _STAGE_POOL.submit(
+        _run_with_cursor, _fts_stage, keywords, expanded_keywords, internal_limit
+    )
+    # 3. 向量检索 (Vector Search)
+    # 向量索引仍在预加载时不等待，直接返回 FTS/概念结果
+    f_vec = None
+    complete = not vdb  # 向量检索未提交 (预加载中) 视为降级
+    if vdb and _vector_ready.is_set():
+        f_vec = _STAGE_POOL.submit(_vec_stage, keywords, internal_limit)
+        complete = True
+
+    concept_results, concept_ok = _stage_result(f_concept, "concept", deadline)
+    fts_stage, fts_ok = _stage_result(f_fts, "FTS", deadline)
+    fts_results, fts_from_and = fts_stage or ([], False)
+    complete = complete and concept_ok and fts_ok
+
+    # 多词 AND 查询已命中足够多条文时，语义补充意义不大，不再等待向量检索
+    vec_results = []
+    if f_vec is not None:
+        if fts_from_and and len(fts_results) >= limit * 3:
+            f_vec.cancel()
+        else:
+            vec_results, vec_ok = _stage_result(f_vec, f"vector ({keywords})", deadline)
+            complete = complete and vec_ok
 
     # 4. RRF Merge
     if not (concept_results or fts_results or vec_results):
-        return f"未找到内容包含'{keywords}'的法条。"
+        return f"未找到内容包含'{keywords}'的法条。", complete
 
     K = 60
-    scores = {} # key -> score
+    rrf_rows = [] # (ord, key, rank, weight)
     data_map = {} # key -> row
 
     def merge_list(lst, weight):
@@ -1102,17 +1322,26 @@ def search_article_content(keywords: str, limit: int = 10):
             # Unique Key: Law + ArticleNum (or content hash)
             # content is unique enough usually. Or Title + Num.
             key = f"{row[3]}_{row[0]}" 
-            rrf = weight / (K + rank + 1)
-            scores[key] = scores.get(key, 0) + rrf
+            rrf_rows.append((len(rrf_rows), key, rank, weight))
             data_map[key] = row
 
     merge_list(concept_results, 2.0)  # Concept: Very High Weight
     merge_list(fts_results, 1.0)      # FTS: High Weight
     merge_list(vec_results, 0.8)      # Vector: Medium Weight
 
-    # Sort
-    sorted_keys = sorted(scores.keys(), key=lambda k: scores[k], reverse=True)
-    final_rows = [data_map[k] for k in sorted_keys[:limit]]
+    # 在 SQLite 中完成 RRF 打分与排序 (同分按首次出现顺序)
+    values = ",".join(["(?,?,?,?)"] * len(rrf_rows))
+    params = [v for r in rrf_rows for v in r]
+    params.append(limit)
+    with get_db_connection() as conn:
+        sorted_keys = [r[0] for r in conn.execute(f"""
+            WITH rrf(ord, key, rank, weight) AS (VALUES {values})
+            SELECT key FROM rrf
+            GROUP BY key
+            ORDER BY SUM(weight / ({K}.0 + rank + 1)) DESC, MIN(ord)
+            LIMIT ?
+        """, params)]
+    final_rows = [data_map[k] for k in sorted_keys]
 
     # Format Output
     formatted = []
@@ -1130,20 +1359,21 @@ def search_article_content(keywords: str, limit: int = 10):
         parts.append(f"📜 Content: {snippet}")
         formatted.append("\n".join(parts))
 
-    return "\n\n".join(formatted)
+    return "\n\n".join(formatted), complete
 
 @mcp.tool()
 def check_law_validity(law_title: str):
     """快速检查法律有效状态。"""
     alias = resolve_law_alias_cached(law_title)
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        if alias:
+    if alias:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute("SELECT title, status, publish_date FROM laws WHERE id = ?", (alias[0],))
-        else:
-            cursor.execute("SELECT title, status, publish_date FROM laws WHERE title LIKE ? ORDER BY publish_date DESC LIMIT 1", (f"%{law_title}%",))
-        row = cursor.fetchone()
-    
+            row = cursor.fetchone()
+    else:
+        row = _resolve_law_by_like(law_title)
+        if row: row = row[1:]
+
     if not row: return f"未找到法律: {law_title}"
     title, status, date = row
     report = f"📋 法律状态报告: {title}\n发布日期: {date}\n状态: {status}"
@@ -1151,8 +1381,11 @@ def check_law_validity(law_title: str):
         report += " ⚠️ 该法律已失效! "
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT title, publish_date FROM laws WHERE title LIKE ? AND status = '有效' AND publish_date > ? LIMIT 1", (f"%{title[:5]}%", date))
-            alt = cursor.fetchone()
+            alt = None
+            for op, pattern in (("GLOB", _glob_prefix(title[:5])), ("LIKE", f"%{title[:5]}%")):
+                cursor.execute(f"SELECT title, publish_date FROM laws WHERE title {op} ? AND status = '有效' AND publish_date > ? LIMIT 1", (pattern, date))
+                alt = cursor.fetchone()
+                if alt: break
             if alt: report += f"\n💡 建议改用: {alt[0]} ({alt[1]})"
     elif status == "有效": report += " ✅"
     return report
@@ -1163,70 +1396,73 @@ def get_law_structure(law_title: str):
     获取法规的目录结构 (TOC)。
     返回编、章、节层级，方便快速了解法规全貌，按需读取特定章节。
     """
-    alias_match = resolve_law_alias_cached(law_title)
+    alias_match = resolve_law_alias_cached(law_title) or _resolve_law_by_like(law_title)
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        row = None
         if alias_match:
             cursor.execute("SELECT id, title, content FROM laws WHERE id = ?", (alias_match[0],))
-        else:
-            cursor.execute("SELECT id, title, content FROM laws WHERE title LIKE ? ORDER BY publish_date DESC LIMIT 1", (f"%{law_title}%",))
-        
-        row = cursor.fetchone()
+            row = cursor.fetchone()
+
         if not row: return f"未找到法律: {law_title}"
         
         law_id, title, content = row
         if not content: return f"《{title}》暂无正文内容。"
         
         structure = []
-        current_bian = None
-        current_zhang = None
-        current_jie = None
-        
-        # 简化的正则 (适应更多格式)
-        p_bian = re.compile(r'^\s*(第[一二三四五六七八九十]+编)\s+(.+)$')
-        p_zhang = re.compile(r'^\s*(第[一二三四五六七八九十]+章)\s+(.+)$')
-        p_jie = re.compile(r'^\s*(第[一二三四五六七八九十]+节)\s+(.+)$')
-        
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            m_bian = p_bian.match(line)
-            if m_bian:
-                current_bian = {'type': '编', 'name': m_bian.group(1), 'title': m_bian.group(2), 'children': []}
-                structure.append(current_bian)
-                current_zhang = None
-                current_jie = None
-                continue
-                
-            m_zhang = p_zhang.match(line)
-            if m_zhang:
-                current_zhang = {'type': '章', 'name': m_zhang.group(1), 'title': m_zhang.group(2), 'children': []}
-                if current_bian: current_bian['children'].append(current_zhang)
-                else: structure.append(current_zhang)
-                current_jie = None
-                continue
-                
-            m_jie = p_jie.match(line)
-            if m_jie:
-                current_jie = {'type': '节', 'name': m_jie.group(1), 'title': m_jie.group(2), 'children': []}
-                if current_zhang: current_zhang['children'].append(current_jie)
-                elif current_bian: current_bian['children'].append(current_jie)
-                else: structure.append(current_jie)
-                continue
+        current = {'编': None, '章': None}
+
+        def add_bian(node):
+            structure.append(node)
+            current['编'] = node
+            current['章'] = None
+
+        def add_zhang(node):
+            parent = current['编']
+            (parent['children'] if parent else structure).append(node)
+            current['章'] = node
+
+        def add_jie(node):
+            parent = current['章'] or current['编']
+            (parent['children'] if parent else structure).append(node)
+
+        builders = {'编': add_bian, '章': add_zhang, '节': add_jie}
+
+        # 单次扫描全文，只命中编/章/节标题行
+        for m in _TOC_PAT.finditer(content):
+            kind = m.group(2)
+            builders[kind]({
+                'type': kind,
+                'name': m.group(1) + kind,
+                'title': m.group(3),
+                'children': [],
+            })
         
         if not structure:
             return f"《{title}》似乎没有采用标准的【编-章-节】结构，可能是单层级条文。建议直接使用 get_article 获取具体法条，或 search_article_content 搜索内容。"
             
         return structure
 
-_LEGAL_STOPWORDS = {
+_LEGAL_STOPWORDS = frozenset({
     "当事人", "合同", "约定", "规定", "条款", "双方", "一方", "甲方", "乙方",
     "应当", "可以", "不得", "应该", "必须", "本合同", "协议", "根据", "依据",
     "进行", "情况", "问题", "事项", "内容", "要求", "条件", "方式", "期限",
     "责任", "权利", "义务", "违反", "承担", "履行", "支付", "相关", "有关",
-}
+})
+
+def _register_legal_stopwords():
+    """将停用词注册到 jieba.analyse，使 TF-IDF 提取阶段即排除 (只接受文件路径)"""
+    fd, path = tempfile.mkstemp(suffix=".txt", prefix="legal_stopwords_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(_LEGAL_STOPWORDS)))
+        jieba.analyse.set_stop_words(path)
+    except Exception as e:
+        logger.warning(f"Failed to register jieba stop words: {e}")
+    finally:
+        os.unlink(path)
+
+_register_legal_stopwords()
 
 @mcp.tool()
 def get_legal_basis(case_description: str, limit: int = 5):
@@ -1239,9 +1475,8 @@ def get_legal_basis(case_description: str, limit: int = 5):
 
     # 1. 使用 jieba 分析关键词 (TF-IDF)
     try:
-        import jieba.analyse
-        # 提取更多候选关键词，再过滤停用词
-        raw_keywords = jieba.analyse.extract_tags(text, topK=12)
+        # 停用词已在 jieba 提取阶段排除，此处过滤仅兜底单字词
+        raw_keywords = _extract_tags_cached(text, 8)
         keywords = [k for k in raw_keywords if len(k) > 1 and k not in _LEGAL_STOPWORDS][:8]
     except ImportError:
         # 降级方案：简单的分词
@@ -1256,26 +1491,93 @@ def get_legal_basis(case_description: str, limit: int = 5):
 
     return search_laws(query, limit=limit)
 
+def _resolve_law_ids(cursor, names):
+    """批量解析法律名称 → law_id: 精确别名 → 精确标题 → 逐个模糊匹配"""
+    resolved = {}
+    if not names:
+        return resolved
+
+    # 1. 精确别名 (升序排列，置信度最高/最新的覆盖在后)
+    cursor.execute(f"""
+        SELECT la.alias, l.id
+        FROM law_aliases la
+        JOIN laws l ON la.law_id = l.id
+        WHERE la.alias IN ({",".join("?" * len(names))}) AND l.status = '有效'
+        ORDER BY la.confidence, l.publish_date
+    """, names)
+    for alias, law_id in cursor.fetchall():
+        resolved[alias] = law_id
+
+    # 2. 精确标题
+    remaining = [n for n in names if n not in resolved]
+    if remaining:
+        cursor.execute(f"""
+            SELECT title, id FROM laws
+            WHERE title IN ({",".join("?" * len(remaining))})
+            ORDER BY publish_date
+        """, remaining)
+        for title, law_id in cursor.fetchall():
+            resolved[title] = law_id
+
+    # 3. 模糊匹配 (少见，逐个处理)
+    for name in names:
+        if name in resolved:
+            continue
+        alias_match = resolve_law_alias_cached(name)
+        if alias_match:
+            resolved[name] = alias_match[0]
+            continue
+        like_match = _resolve_law_by_like(name)
+        if like_match:
+            resolved[name] = like_match[0]
+
+    return resolved
+
+
 @mcp.tool()
 def batch_verify_citations(document_text: str):
     """批量核验文档中的法条引用(如《民法典》第147条、民法典第147条之一、《公司法》第71条第2款)"""
-    # 模式1: 《法律名》第X条 (支持"之一"后缀和"第X款")
-    pattern1 = re.compile(r'《([^》]+)》第([一二三四五六七八九十百千万零\d]+)条(?:之[一二三四五六七八九十]+)?')
-    # 模式2: 无书名号，如 "民法典第147条" (法律名以法/典/条例/规定/办法结尾)
-    pattern2 = re.compile(r'(?<![《])([一-龥]{2,10}(?:法|典|条例|规定|办法))第([一二三四五六七八九十百千万零\d]+)条(?:之[一二三四五六七八九十]+)?')
-
-    matches = pattern1.findall(document_text) + pattern2.findall(document_text)
-    if not matches: return "未识别到法条引用。"
-
-    report = f"📋 批量核验报告 (发现 {len(matches)} 处)\n" + "="*40 + "\n"
-    seen = set()
-    for law, num in matches:
-        cite = f"《{law}》第{num}条"
-        if cite in seen: continue
-        seen.add(cite)
-        res = get_article(law, num)
-        if "已废止" in res: report += f"❌ {cite}: 已废止! ⚠️\n"
-        elif "有效" in res: report += f"✅ {cite}: 有效\n"
+    total = 0
+    cites = {}  # cite -> (law, num)
+    for m in _PAT_CITE.finditer(document_text):
+        if m.group(2):  # 未闭合的书名号，不视为引用
+            continue
+        total += 1
+        law, num = m.group(1) or m.group(3), m.group(4)
+        cites.setdefault(f"《{law}》第{num}条", (law, num))
+
+    if not total: return "未识别到法条引用。"
+
+    # 一次解析全部法律名，再用一条 JOIN 查询核验所有 (law_id, 条号)
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        law_ids = _resolve_law_ids(cursor, list(dict.fromkeys(law for law, _ in cites.values())))
+
+        targets = {}  # cite -> (law_id, article_int)
+        for cite, (law, num) in cites.items():
+            law_id = law_ids.get(law)
+            article_int = _parse_article_number_input(num)
+            if law_id and article_int > 0:
+                targets[cite] = (law_id, article_int)
+
+        statuses = {}
+        pairs = list(dict.fromkeys(targets.values()))
+        if pairs:
+            cursor.execute(f"""
+                WITH t(law_id, num) AS (VALUES {",".join(["(?,?)"] * len(pairs))})
+                SELECT DISTINCT t.law_id, t.num, l.status
+                FROM t
+                JOIN laws l ON l.id = t.law_id
+                JOIN law_articles la
+                  ON la.law_id = t.law_id AND la.article_number_int = t.num
+            """, [v for pair in pairs for v in pair])
+            statuses = {(r[0], r[1]): r[2] for r in cursor.fetchall()}
+
+    report = f"📋 批量核验报告 (发现 {total} 处)\n" + "="*40 + "\n"
+    for cite in cites:
+        status = statuses.get(targets.get(cite))
+        if status == "已废止": report += f"❌ {cite}: 已废止! ⚠️\n"
+        elif status == "有效": report += f"✅ {cite}: 有效\n"
         else: report += f"❓ {cite}: 无法验证或未找到\n"
     return report
 
@@ -1285,16 +1587,21 @@ def clear_caches():
     try:
         resolve_law_alias_cached.cache_clear()
         get_law_by_id_cached.cache_clear()
+        _resolve_law_by_like.cache_clear()
         resolve_concept_cached.cache_clear()
+        _SYNONYM_CACHE.clear()
+        _tokenize_cached.cache_clear()
+        _articles_fts_is_trigram.cache_clear()
+        _extract_tags_cached.cache_clear()
+        with _search_cache_lock:
+            _SEARCH_CACHE.clear()
         if hasattr(expand_query, "cache_clear"):
             expand_query.cache_clear()
         
         # 重新加载向量索引
         if vdb:
             try:
-                from vector_db import get_vector_index
-                vec_index = get_vector_index(str(DB_PATH))
-                vec_index.reload()
+                _vec_idx().reload()
             except Exception as e:
                 logger.warning(f"Failed to reload vector index: {e}")
                 
@@ -40,6 +40,55 @@ def migrate():
         # 4. Skip articles_fts as articles table does not exist
         print("Skipping articles_fts creation (articles table missing).")
         
+        # 5. Recreate law_articles_fts with trigram tokenizer (if law_articles exists)
+        # trigram makes CJK substring queries index-backed, so search no longer
+        # needs a full-scan LIKE fallback for terms of 3+ characters.
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='law_articles'")
+        if cursor.fetchone():
+            print("Recreating law_articles_fts with trigram tokenizer...")
+            cursor.execute("DROP TRIGGER IF EXISTS law_articles_ai")
+            cursor.execute("DROP TRIGGER IF EXISTS law_articles_ad")
+            cursor.execute("DROP TRIGGER IF EXISTS law_articles_au")
+            cursor.execute("DROP TABLE IF EXISTS law_articles_fts")
+            cursor.execute("""
+                CREATE VIRTUAL TABLE law_articles_fts USING fts5(
+                    content,
+                    article_number_str,
+                    chapter_path,
+                    tokenize='trigram'
+                )
+            """)
+            
+            # Standalone FTS table: populate directly from law_articles
+            print("Populating law_articles_fts...")
+            cursor.execute("""
+                INSERT INTO law_articles_fts(rowid, content, article_number_str, chapter_path)
+                SELECT id, content, article_number_str, chapter_path FROM law_articles
+            """)
+            
+            # Keep FTS in sync (standalone-table triggers, as in migration 004)
+            cursor.execute("""
+                CREATE TRIGGER law_articles_ai AFTER INSERT ON law_articles BEGIN
+                    INSERT INTO law_articles_fts(rowid, content, article_number_str, chapter_path)
+                    VALUES (new.id, new.content, new.article_number_str, new.chapter_path);
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER law_articles_ad AFTER DELETE ON law_articles BEGIN
+                    DELETE FROM law_articles_fts WHERE rowid = old.id;
+                END
+            """)
+            cursor.execute("""
+                CREATE TRIGGER law_articles_au AFTER UPDATE ON law_articles BEGIN
+                    DELETE FROM law_articles_fts WHERE rowid = old.id;
+                    INSERT INTO law_articles_fts(rowid, content, article_number_str, chapter_path)
+                    VALUES (new.id, new.content, new.article_number_str, new.chapter_path);
+                END
+            """)
+            print("law_articles_fts rebuilt with trigram tokenizer.")
+        else:
+            print("Skipping law_articles_fts (law_articles table missing; migration 003 creates it).")
+        
         conn.commit()
         print("Migration successful!")
         
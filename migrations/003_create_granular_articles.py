@@ -18,6 +18,7 @@
 import sqlite3
 import sys
 import time
+import multiprocessing
 import logging
 from pathlib import Path
 
@@ -26,8 +27,13 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from article_splitter import ArticleSplitter
+from db_tuning import tune, bulk_load
+from parse_cache import ParseCache
 
 DB_PATH = project_root / "legal_database.db"
+INSERT_BATCH = 5000  # 每次 executemany 的法条数
+COMMIT_EVERY = 500   # 回填期间每多少部法律提交一次
+READ_CHUNK = 200     # 每次从 laws 读取的法律数
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,6 +43,46 @@ logging.basicConfig(
 logger = logging.getLogger("migration-003")
 
 
+# 工作进程内复用的拆分器 (每个进程首次使用时创建)
+_splitter = None
+
+
+def _split_one(row):
+    """在工作进程中拆分单部法律，返回 (law_id, title, articles, error)"""
+    global _splitter
+    law_id, law_title, law_content = row
+    if _splitter is None:
+        _splitter = ArticleSplitter()
+    try:
+        return law_id, law_title, _splitter.split_law(law_content), None
+    except Exception as e:
+        return law_id, law_title, None, e
+
+
+def _iter_split(pool, read_cur, cache):
+    """
+    分块读取 (id, title, content) 交给进程池拆分，内存中最多保留 READ_CHUNK 部正文。
+    命中 parse_cache 的法律不再解析；每块内仍按读取顺序产出。
+    """
+    while True:
+        rows = read_cur.fetchmany(READ_CHUNK)
+        if not rows:
+            return
+        keys = [cache.key(content) for _, _, content in rows]
+        cached = [cache.get(row[0], h) for row, h in zip(rows, keys)]
+        misses = [row for row, arts in zip(rows, cached) if arts is None]
+        fresh = iter(pool.imap(_split_one, misses, chunksize=8))
+        for row, h, arts in zip(rows, keys, cached):
+            if arts is not None:
+                yield row[0], row[1], arts, None
+                continue
+            result = next(fresh)
+            if result[3] is None:
+                cache.put(row[0], h, result[2])
+            yield result
+        cache.flush()
+
+
 def run_migration():
     """执行数据库迁移"""
     print("=" * 60)
@@ -47,11 +93,10 @@ def run_migration():
         print(f"❌ 数据库文件不存在: {DB_PATH}")
         return False
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA synchronous=NORMAL")
+    conn = tune(sqlite3.connect(DB_PATH))
+    conn.execute("PRAGMA cache_size=-200000")  # 200 MB，回填期间 B-tree 页常驻
+    conn.execute("PRAGMA wal_autocheckpoint=10000")  # 减少写入过程中的检查点停顿
     cursor = conn.cursor()
-    splitter = ArticleSplitter()
 
     try:
         # ========== Step 1: Schema ==========
@@ -66,7 +111,7 @@ def run_migration():
 
         cursor.execute("""
             CREATE TABLE law_articles (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id INTEGER PRIMARY KEY,       -- 无需 AUTOINCREMENT: 表只整体重建，不删单行
                 law_id INTEGER NOT NULL,
                 article_number_int INTEGER,   -- 整数序号: 1023 (排序/过滤)
                 article_number_str TEXT,       -- 字符串序号: "120之一" (展示/特殊编号)
@@ -91,61 +136,95 @@ def run_migration():
 
         # ========== Step 3: Backfill ==========
         print("\n[3/5] 回填数据 (从 laws 表拆分)...")
-        cursor.execute("SELECT id, title, content FROM laws WHERE status = '有效'")
-        laws = cursor.fetchall()
-        total_laws = len(laws)
+        cursor.execute(
+            "SELECT count(*) FROM laws "
+            "WHERE status = '有效' AND content IS NOT NULL AND content != ''"
+        )
+        total_laws = cursor.fetchone()[0]
         total_articles = 0
         error_count = 0
         t0 = time.time()
 
-        for i, (law_id, law_title, law_content) in enumerate(laws):
-            if not law_content:
-                continue
+        # 回填期间表可整体重建，关闭日志/同步/外键检查，结束后恢复 WAL
+        # 拆分为纯 CPU 计算，交给进程池并行；主进程仍是唯一写入者。
+        # imap 保持原有顺序，article id 与串行回填一致。
+        # 正文经独立读游标分块流式读取，不一次性载入全部法律。
+        read_cur = conn.cursor()
+        mega_batch = []
+
+        def flush():
+            nonlocal total_articles
+            cursor.executemany(
+                "INSERT INTO law_articles "
+                "(law_id, article_number_int, article_number_str, content, chapter_path) "
+                "VALUES (?, ?, ?, ?, ?)",
+                mega_batch
+            )
+            total_articles += len(mega_batch)
+            mega_batch.clear()
 
+        # 拆分结果缓存在 parse_cache.db，重跑时跳过未变化的正文
+        cache = ParseCache()
+        with bulk_load(conn), multiprocessing.Pool() as pool:
+            # 读游标须在 bulk_load 恢复 WAL 之前关闭，否则未结束的语句使 journal_mode 切换失败
             try:
-                articles = splitter.split_law(law_content)
-                if not articles:
-                    continue
-
-                batch = []
-                for art in articles:
-                    batch.append((
-                        law_id,
-                        art['article_number_int'],
-                        art['article_number_str'],
-                        art['content'],
-                        art['chapter_path'],
-                    ))
-
-                if batch:
-                    cursor.executemany(
-                        "INSERT INTO law_articles "
-                        "(law_id, article_number_int, article_number_str, content, chapter_path) "
-                        "VALUES (?, ?, ?, ?, ?)",
-                        batch
-                    )
-                    total_articles += len(batch)
-
-                # 定期提交 + 进度报告
-                if (i + 1) % 50 == 0:
-                    conn.commit()
-                    elapsed = time.time() - t0
-                    print(f"   进度: {i+1}/{total_laws} ({total_articles} 条, "
-                          f"{elapsed:.1f}s, {error_count} 错误)")
-
-            except Exception as e:
-                error_count += 1
-                if error_count <= 5:
-                    logger.warning(f"处理 [{law_title[:20]}] 出错: {e}")
+                read_cur.execute(
+                    "SELECT id, title, content FROM laws "
+                    "WHERE status = '有效' AND content IS NOT NULL AND content != ''"
+                )
+                parsed = _iter_split(pool, read_cur, cache)
+                for i, (law_id, law_title, articles, err) in enumerate(parsed):
+                    if err is not None:
+                        error_count += 1
+                        if error_count <= 5:
+                            logger.warning(f"处理 [{law_title[:20]}] 出错: {err}")
+                        continue
+
+                    if not articles:
+                        continue
+
+                    for art in articles:
+                        mega_batch.append((
+                            law_id,
+                            art['article_number_int'],
+                            art['article_number_str'],
+                            art['content'],
+                            art['chapter_path'],
+                        ))
+
+                    # 跨法律累积，满 INSERT_BATCH 条再一次 executemany
+                    if len(mega_batch) >= INSERT_BATCH:
+                        flush()
+
+                    # 定期提交 (每 COMMIT_EVERY 部) + 进度报告 (每 50 部)
+                    if (i + 1) % COMMIT_EVERY == 0:
+                        conn.commit()
+                    if (i + 1) % 50 == 0:
+                        elapsed = time.time() - t0
+                        print(f"   进度: {i+1}/{total_laws} ({total_articles} 条, "
+                              f"{elapsed:.1f}s, {error_count} 错误)")
+            finally:
+                read_cur.close()
+
+            if mega_batch:
+                flush()
 
         conn.commit()
+        cache.close()
         elapsed = time.time() - t0
         print(f"   ✅ 回填完成: {total_laws} 部法律 → {total_articles} 条 "
-              f"({elapsed:.1f}s, {error_count} 错误)")
+              f"({elapsed:.1f}s, {error_count} 错误, {cache.hits} 部命中缓存)")
 
         # ========== Step 4: Rebuild FTS ==========
+        # 回填期间 FTS 保持为空 (触发器在 Step 5 才创建)，此处一次性灌入。
+        # law_articles_fts 为独立 FTS 表 (非 external content)，'rebuild'
+        # 对它无数据来源，需直接 INSERT ... SELECT；随后 'optimize' 合并段。
         print("\n[4/5] 重建 FTS 索引...")
-        cursor.execute("INSERT INTO law_articles_fts(law_articles_fts) VALUES('rebuild')")
+        cursor.execute("""
+            INSERT INTO law_articles_fts(rowid, content, article_number_str, chapter_path)
+            SELECT id, content, article_number_str, chapter_path FROM law_articles
+        """)
+        cursor.execute("INSERT INTO law_articles_fts(law_articles_fts) VALUES('optimize')")
         conn.commit()
         print("   ✅ FTS 索引已重建")
 
@@ -160,19 +239,17 @@ def run_migration():
             END
         """)
 
-        # Delete trigger
+        # Delete trigger (独立 FTS 表不支持 'delete' 命令，按 rowid 删除)
         cursor.execute("""
             CREATE TRIGGER law_articles_ad AFTER DELETE ON law_articles BEGIN
-                INSERT INTO law_articles_fts(law_articles_fts, rowid, content, article_number_str, chapter_path)
-                VALUES('delete', old.id, old.content, old.article_number_str, old.chapter_path);
+                DELETE FROM law_articles_fts WHERE rowid = old.id;
             END
         """)
 
         # Update trigger
         cursor.execute("""
             CREATE TRIGGER law_articles_au AFTER UPDATE ON law_articles BEGIN
-                INSERT INTO law_articles_fts(law_articles_fts, rowid, content, article_number_str, chapter_path)
-                VALUES('delete', old.id, old.content, old.article_number_str, old.chapter_path);
+                DELETE FROM law_articles_fts WHERE rowid = old.id;
                 INSERT INTO law_articles_fts(rowid, content, article_number_str, chapter_path)
                 VALUES (new.id, new.content, new.article_number_str, new.chapter_path);
             END
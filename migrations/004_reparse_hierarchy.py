@@ -8,6 +8,7 @@ to populate the `chapter_path` column with full hierarchy (Book > Part > Chapter
 
 import sqlite3
 import sys
+import multiprocessing
 import logging
 from pathlib import Path
 
@@ -15,22 +16,60 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from article_splitter import ArticleSplitter
+from db_tuning import tune
+from parse_cache import ParseCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 DB_PATH = Path(__file__).parent.parent / "legal_database.db"
+READ_CHUNK = 200   # laws read from the cursor per batch
+
+# Per-worker splitter, created lazily on first use in each pool process
+_splitter = None
+
+def _split_one(row):
+    """Split one law in a worker process; returns (law_id, title, articles)"""
+    global _splitter
+    law_id, title, content = row
+    if _splitter is None:
+        _splitter = ArticleSplitter()
+    return law_id, title, _splitter.split_law(content)
+
+def _iter_split(pool, read_cur, cache):
+    """Feed laws to the pool in READ_CHUNK-sized batches; yields split results.
+    Laws whose parse is already in the parse cache skip the pool entirely."""
+    while True:
+        rows = read_cur.fetchmany(READ_CHUNK)
+        if not rows:
+            return
+        keys = {}
+        misses = []
+        for law_id, title, content in rows:
+            h = cache.key(content)
+            articles = cache.get(law_id, h)
+            if articles is None:
+                keys[law_id] = h
+                misses.append((law_id, title, content))
+            else:
+                yield law_id, title, articles
+        for law_id, title, articles in pool.imap_unordered(_split_one, misses, chunksize=8):
+            cache.put(law_id, keys[law_id], articles)
+            yield law_id, title, articles
+        cache.flush()
 
 def run_migration():
     if not DB_PATH.exists():
         logger.error(f"Database not found: {DB_PATH}")
         return
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = tune(sqlite3.connect(DB_PATH))
+    conn.isolation_level = None  # manage transactions explicitly
     cursor = conn.cursor()
-    splitter = ArticleSplitter()
 
     try:
+        cursor.execute("BEGIN IMMEDIATE")
+
         # 0. Fix Triggers for Standalone FTS Table
         # The previous rebuild might have created triggers for external content table, 
         # but we created a standalone table. We need to fix them to avoid "SQL logic error".
@@ -58,41 +97,74 @@ def run_migration():
                 VALUES (new.id, new.content, new.article_number_str, new.chapter_path);
             END
         """)
-        conn.commit()
+        cursor.execute("COMMIT")
         logger.info("Triggers fixed.")
 
         # 1. Get all laws
         logger.info("Fetching all laws...")
-        cursor.execute("SELECT id, title, content FROM laws WHERE status = '有效'")
-        laws = cursor.fetchall()
-        
-        logger.info(f"Found {len(laws)} active laws to re-parse.")
+        cursor.execute(
+            "SELECT count(*) FROM laws "
+            "WHERE status = '有效' AND content IS NOT NULL AND content != ''"
+        )
+        logger.info(f"Found {cursor.fetchone()[0]} active laws to re-parse.")
         
         updated_count = 0
         
-        for law_id, title, content in laws:
-            logger.info(f"Processing: {title} (ID: {law_id})")
-            
-            # Reparse content
-            articles = splitter.split_law(content)
-            
-            # Update each article's chapter_path in law_articles
-            # We match by law_id and article_number_int
-            
-            for art in articles:
-                path = art['chapter_path']
-                art_num = art['article_number_int']
-                
-                if path:
-                    cursor.execute("""
-                        UPDATE law_articles 
-                        SET chapter_path = ? 
-                        WHERE law_id = ? AND article_number_int = ?
-                    """, (path, law_id, art_num))
-                    
-            updated_count += len(articles)
+        # Stage computed paths in an in-memory database, then apply them with a
+        # single set-based UPDATE instead of one statement per article.
+        # ATTACH is not allowed inside a transaction, so do it up front.
+        cursor.execute("ATTACH ':memory:' AS stg")
+        cursor.execute("CREATE TABLE stg.paths(id INTEGER PRIMARY KEY, path TEXT)")
+        
+        # Resolve (law_id, article_number_int) to article ids once, so the final
+        # UPDATE is a rowid lookup rather than an idx_la_law_num probe per row.
+        # A key can map to several ids (e.g. 第X条之一 shares its number).
+        id_map = {}
+        for rid, lid, art_int in cursor.execute(
+            "SELECT id, law_id, article_number_int FROM law_articles"
+        ):
+            id_map.setdefault((lid, art_int), []).append(rid)
+        
+        # Parsing is pure CPU work: fan it out to a process pool while this
+        # process stays the only SQLite writer. Laws are streamed through a
+        # separate read cursor instead of being loaded all at once.
+        read_cur = conn.cursor()
+        # Laws without content have nothing to split (and nothing to hash for the cache)
+        read_cur.execute(
+            "SELECT id, title, content FROM laws "
+            "WHERE status = '有效' AND content IS NOT NULL AND content != ''"
+        )
+        cache = ParseCache()
+        with multiprocessing.Pool() as pool:
+            for law_id, title, articles in _iter_split(pool, read_cur, cache):
+                logger.info(f"Processing: {title} (ID: {law_id})")
             
-        conn.commit()
+                # OR REPLACE keeps the last path for duplicate article numbers,
+                # matching the previous per-article UPDATE order
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO stg.paths VALUES (?, ?)",
+                    [
+                        (rid, art['chapter_path'])
+                        for art in articles
+                        if art['chapter_path']
+                        for rid in id_map.get((law_id, art['article_number_int']), ())
+                    ],
+                )
+                updated_count += len(articles)
+        read_cur.close()
+        cache.close()
+        logger.info(f"Parse cache hits: {cache.hits}")
+        
+        logger.info("Applying staged chapter paths...")
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            UPDATE law_articles
+            SET chapter_path = (SELECT path FROM stg.paths WHERE stg.paths.id = law_articles.id)
+            WHERE id IN (SELECT id FROM stg.paths)
+        """)
+        cursor.execute("COMMIT")
+        cursor.execute("DETACH DATABASE stg")
+        del id_map
         logger.info(f"Migration complete. Updated hierarchy for {updated_count} articles.")
 
         # Verify a few
@@ -109,7 +181,8 @@ def run_migration():
 
     except Exception as e:
         logger.error(f"Migration failed: {e}")
-        conn.rollback()
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
     finally:
         conn.close()
 
@@ -6,28 +6,63 @@
 import sqlite3
 from pathlib import Path
 
+from db_tuning import tune
+
 # DB is in the parent directory (project root), not in migrations/
 DB_PATH = Path(__file__).parent.parent / "legal_database.db"
 
-def create_cross_ref_table(conn, c):
-    print("=== P2: 创建 article_cross_references 表 ===")
-    
-    # 1. Create table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS article_cross_references (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+# 以自然键为主键的 WITHOUT ROWID 表: 行直接存放在主键 B-tree 中，
+# 无需额外的 rowid 表和 UNIQUE 索引；主键前缀即覆盖按源条文查询
+CREATE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS {name} (
             source_law_id INTEGER NOT NULL,       -- 源法律ID (如民法典)
             source_article_int INTEGER NOT NULL,  -- 源条号 (如 538)
             target_law_id INTEGER NOT NULL,       -- 目标法律ID (如合同编解释)
             target_article_int INTEGER NOT NULL,  -- 目标条号 (如 44)
             ref_type TEXT DEFAULT 'interpretation', -- 引用类型: interpretation, conflicting, related
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(source_law_id, source_article_int, target_law_id, target_article_int)
-        )
-    """)
+            PRIMARY KEY (source_law_id, source_article_int, target_law_id, target_article_int)
+        ) WITHOUT ROWID
+"""
+COLUMNS = "source_law_id, source_article_int, target_law_id, target_article_int, ref_type, created_at"
+
+
+def convert_legacy_table(conn, c):
+    """
+    旧版 006 建的是带自增 id + UNIQUE 约束的 rowid 表，CREATE TABLE IF NOT EXISTS 不会改动它:
+    建新表、按 id 顺序复制 (重复键保留最早一条)、删旧表 (连同其索引)、改名。
+    """
+    columns = [row[1] for row in c.execute("PRAGMA table_info(article_cross_references)")]
+    if 'id' not in columns:
+        return
+
+    print("  检测到旧版 rowid 表结构，转换为 WITHOUT ROWID...")
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        c.execute("DROP TABLE IF EXISTS article_cross_references_new")
+        c.execute(CREATE_TABLE_SQL.format(name="article_cross_references_new"))
+        c.execute(f"""
+            INSERT OR IGNORE INTO article_cross_references_new ({COLUMNS})
+            SELECT {COLUMNS} FROM article_cross_references ORDER BY id
+        """)
+        c.execute("DROP TABLE article_cross_references")  # 同时删除 idx_cross_ref_source/target
+        c.execute("ALTER TABLE article_cross_references_new RENAME TO article_cross_references")
+        c.execute("COMMIT")
+    except Exception:
+        c.execute("ROLLBACK")
+        raise
+    count = c.execute("SELECT count(*) FROM article_cross_references").fetchone()[0]
+    print(f"  ✅ 已转换 {count} 条关联数据")
+
+
+def create_cross_ref_table(conn, c):
+    print("=== P2: 创建 article_cross_references 表 ===")
+    
+    # 1. Create table (已有旧版表时先转换)
+    convert_legacy_table(conn, c)
+    c.execute(CREATE_TABLE_SQL.format(name="article_cross_references"))
     
-    # 2. Create indices
-    c.execute("CREATE INDEX IF NOT EXISTS idx_cross_ref_source ON article_cross_references(source_law_id, source_article_int)")
+    # 2. Create indices (源方向由主键覆盖，只需目标方向索引)
     c.execute("CREATE INDEX IF NOT EXISTS idx_cross_ref_target ON article_cross_references(target_law_id, target_article_int)")
     
     print("  ✅ 表结构已创建/确认")
@@ -42,19 +77,30 @@ def populate_initial_data(conn, c):
     """
     print("=== P2: 填充初始关联数据 ===")
     
-    # Helper to find law ID
-    def get_law_id(title_part):
-        # 优先全称匹配
-        c.execute("SELECT id FROM laws WHERE title = ? AND status='有效' LIMIT 1", (title_part,))
-        res = c.fetchone()
-        if res: return res[0]
-        # 模糊匹配
-        c.execute("SELECT id FROM laws WHERE title LIKE ? AND status='有效' ORDER BY (title = ?) DESC LIMIT 1", (f"%{title_part}%", title_part))
-        res = c.fetchone()
-        return res[0] if res else None
-
-    civ_code_id = get_law_id("中华人民共和国民法典")
-    contract_interp_id = get_law_id("最高人民法院关于适用《中华人民共和国民法典》合同编通则若干问题的解释")
+    # Helper to find law IDs: one query for all titles, resolved in Python
+    def get_law_ids(*titles):
+        likes = " OR ".join(["title LIKE ?"] * len(titles))
+        c.execute(f"""
+            SELECT id, title FROM laws
+            WHERE status = '有效'
+              AND (title IN ({",".join("?" * len(titles))}) OR {likes})
+        """, [*titles, *(f"%{t}%" for t in titles)])
+        rows = c.fetchall()
+        by_title = {title: law_id for law_id, title in rows}
+        resolved = {}
+        for t in titles:
+            # 优先全称匹配，其次模糊匹配
+            if t in by_title:
+                resolved[t] = by_title[t]
+            else:
+                resolved[t] = next((law_id for law_id, title in rows if t in title), None)
+        return resolved
+
+    civ_code_title = "中华人民共和国民法典"
+    contract_interp_title = "最高人民法院关于适用《中华人民共和国民法典》合同编通则若干问题的解释"
+    law_ids = get_law_ids(civ_code_title, contract_interp_title)
+    civ_code_id = law_ids[civ_code_title]
+    contract_interp_id = law_ids[contract_interp_title]
 
     if not civ_code_id or not contract_interp_id:
         print(f"  ⚠️ 未找到相关法律ID (民法典={civ_code_id}, 合同编解释={contract_interp_id})，跳过数据填充")
@@ -67,17 +113,16 @@ def populate_initial_data(conn, c):
         (540, 45), (541, 45)
     ]
 
-    count = 0
-    for s_art, t_art in relations:
-        try:
-            c.execute("""
-                INSERT OR IGNORE INTO article_cross_references 
-                (source_law_id, source_article_int, target_law_id, target_article_int, ref_type)
-                VALUES (?, ?, ?, ?, 'interpretation')
-            """, (civ_code_id, s_art, contract_interp_id, t_art))
-            if c.rowcount > 0: count += 1
-        except Exception as e:
-            print(f"  ❌ 插入失败 {s_art}->{t_art}: {e}")
+    before = conn.total_changes
+    try:
+        c.executemany("""
+            INSERT OR IGNORE INTO article_cross_references 
+            (source_law_id, source_article_int, target_law_id, target_article_int, ref_type)
+            VALUES (?, ?, ?, ?, 'interpretation')
+        """, [(civ_code_id, s_art, contract_interp_id, t_art) for s_art, t_art in relations])
+    except Exception as e:
+        print(f"  ❌ 插入失败: {e}")
+    count = conn.total_changes - before
 
     conn.commit()
     print(f"  ✅ 插入了 {count} 条手动关联数据")
@@ -88,7 +133,7 @@ def main():
         print(f"❌ 数据库文件不存在: {DB_PATH}")
         return
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = tune(sqlite3.connect(DB_PATH))
     c = conn.cursor()
     
     try:
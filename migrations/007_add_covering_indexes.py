@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+为检索热路径添加覆盖索引。
+
+FTS 检索均为 `JOIN laws l ON la.law_id = l.id WHERE l.status = '有效'`，
+覆盖索引使 status/title/publish_date 可直接从索引读取，无需回表。
+"""
+
+import sqlite3
+from pathlib import Path
+
+# DB is in the parent directory (project root), not in migrations/
+DB_PATH = Path(__file__).parent.parent / "legal_database.db"
+
+def create_covering_indexes(conn, c):
+    print("=== 创建覆盖索引 ===")
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_laws_id_status_title_date ON laws(id, status, title, publish_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_la_id_law ON law_articles(id, law_id)")
+    conn.commit()
+
+    print("  ✅ 索引已创建/确认")
+
+def refresh_stats(conn, c):
+    print("=== 更新查询规划统计信息 ===")
+    c.execute("ANALYZE")
+    c.execute("PRAGMA optimize")
+    conn.commit()
+    print("  ✅ ANALYZE 完成")
+
+def main():
+    print(f"数据库: {DB_PATH}")
+    if not DB_PATH.exists():
+        print(f"❌ 数据库文件不存在: {DB_PATH}")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    try:
+        create_covering_indexes(conn, c)
+        refresh_stats(conn, c)
+    except Exception as e:
+        print(f"\n❌ 错误: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print("\n🎉 迁移完成！")
+
+if __name__ == "__main__":
+    main()
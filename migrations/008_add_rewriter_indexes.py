@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+为查询重写 (query_rewriter.expand_query) 添加索引。
+
+expand_query 的 UNION ALL 查询按 law_aliases.alias、laws.title、
+concept_synonyms.term 和 concept_synonyms.canonical_term 四个方向做等值查找，
+缺少索引的列会退化为全表扫描。
+"""
+
+import sqlite3
+from pathlib import Path
+
+# DB is in the parent directory (project root), not in migrations/
+DB_PATH = Path(__file__).parent.parent / "legal_database.db"
+
+def create_rewriter_indexes(conn, c):
+    print("=== 创建查询重写索引 ===")
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_aliases_text ON law_aliases(alias)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_laws_title ON laws(title)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_concept_synonyms_term ON concept_synonyms(term)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_concept_synonyms_canonical ON concept_synonyms(canonical_term)")
+    conn.commit()
+
+    print("  ✅ 索引已创建/确认")
+
+def main():
+    print(f"数据库: {DB_PATH}")
+    if not DB_PATH.exists():
+        print(f"❌ 数据库文件不存在: {DB_PATH}")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    try:
+        create_rewriter_indexes(conn, c)
+        c.execute("ANALYZE")
+        conn.commit()
+    except Exception as e:
+        print(f"\n❌ 错误: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print("\n🎉 迁移完成！")
+
+if __name__ == "__main__":
+    main()
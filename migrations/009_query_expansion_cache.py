@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+为查询重写 (query_rewriter.expand_query) 创建持久化扩展缓存。
+
+lru_cache 只在单个进程内有效，各 worker / 重启后都要重新查库；
+query_expansion_cache 按查询词存放扩展结果，跨进程、跨重启共享。
+
+失效: query_expansion_version 单行表保存版本号，law_aliases、concept_synonyms
+以及 laws (id/title/status) 的任何写入都由触发器将其 +1；缓存行只在
+version 与当前版本一致时命中，旧条目随之整体失效。
+可重复运行: 缓存表每次重建 (同时清掉旧版进程内自动建出的同名表)。
+"""
+
+import sqlite3
+from pathlib import Path
+
+# DB is in the parent directory (project root), not in migrations/
+DB_PATH = Path(__file__).parent.parent / "legal_database.db"
+
+# 影响 expand_query 结果的写入: (表, 触发事件)
+VERSION_TRIGGERS = [
+    ("law_aliases", "INSERT"),
+    ("law_aliases", "UPDATE"),
+    ("law_aliases", "DELETE"),
+    ("concept_synonyms", "INSERT"),
+    ("concept_synonyms", "UPDATE"),
+    ("concept_synonyms", "DELETE"),
+    ("laws", "INSERT"),
+    ("laws", "UPDATE OF id, title, status"),
+    ("laws", "DELETE"),
+]
+
+
+def create_expansion_cache(conn, c):
+    print("=== 创建查询扩展缓存 ===")
+
+    c.execute("DROP TABLE IF EXISTS query_expansion_cache")
+    c.execute("""
+        CREATE TABLE query_expansion_cache (
+            query TEXT PRIMARY KEY,
+            expanded TEXT NOT NULL,
+            version INTEGER NOT NULL,              -- 写入时的 query_expansion_version
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS query_expansion_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    c.execute("INSERT OR IGNORE INTO query_expansion_version VALUES (1, 0)")
+    print("  ✅ query_expansion_cache / query_expansion_version 已创建")
+
+    for table, event in VERSION_TRIGGERS:
+        name = f"{table}_qe_{event.split()[0].lower()}"
+        c.execute(f"DROP TRIGGER IF EXISTS {name}")
+        c.execute(f"""
+            CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN
+                UPDATE query_expansion_version SET version = version + 1;
+            END
+        """)
+    conn.commit()
+    print(f"  ✅ {len(VERSION_TRIGGERS)} 个版本触发器已创建")
+
+def main():
+    print(f"数据库: {DB_PATH}")
+    if not DB_PATH.exists():
+        print(f"❌ 数据库文件不存在: {DB_PATH}")
+        return
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    try:
+        create_expansion_cache(conn, c)
+    except Exception as e:
+        print(f"\n❌ 错误: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+    print("\n🎉 迁移完成！")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+迁移脚本共用的 SQLite 连接调优。
+
+默认的 rollback journal + synchronous=FULL 让每次写入都要两次 fsync；
+迁移均为批量写入，统一切到 WAL + NORMAL，并开启内存映射读和大页缓存。
+"""
+
+from contextlib import contextmanager
+
+
+def tune(conn):
+    """对迁移连接应用 WAL/synchronous/mmap/cache PRAGMA"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=30000000000")  # 超出编译上限时 SQLite 自动截断
+    conn.execute("PRAGMA cache_size=-64000")      # 64 MB
+    return conn
+
+
+@contextmanager
+def bulk_load(conn):
+    """
+    批量导入窗口: 关闭日志、同步和外键检查，结束后 (含异常) 恢复 WAL + NORMAL。
+    期间崩溃可能损坏数据库，只用于可整体重跑的步骤 (如 DROP + CREATE 后的回填)。
+    """
+    conn.commit()  # journal_mode 不能在事务内切换
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA foreign_keys=OFF")
+    try:
+        yield conn
+    finally:
+        conn.commit()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
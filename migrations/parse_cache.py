@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+迁移脚本共用的法条拆分结果缓存。
+
+003/004 都会对同一批法律正文重复调用 ArticleSplitter.split_law；
+将拆分结果按 (law_id, 内容摘要) pickle 存入独立的 parse_cache.db，
+重跑迁移时命中缓存即可跳过解析。摘要同时覆盖 article_splitter.py 源码，
+拆分逻辑一旦修改，旧缓存自动失效。
+"""
+
+import hashlib
+import pickle
+import sqlite3
+from pathlib import Path
+
+CACHE_PATH = Path(__file__).parent.parent / "parse_cache.db"
+SPLITTER_SRC = Path(__file__).parent.parent / "article_splitter.py"
+
+
+class ParseCache:
+    """split_law 结果的磁盘缓存 (仅主进程读写)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                law_id INTEGER,
+                hash TEXT,
+                articles BLOB,
+                PRIMARY KEY (law_id, hash)
+            ) WITHOUT ROWID
+        """)
+        self._salt = hashlib.sha1(SPLITTER_SRC.read_bytes()).digest()
+        self._pending = []
+        self.hits = 0
+
+    def key(self, content):
+        """正文 + 拆分器源码的 sha1"""
+        h = hashlib.sha1(self._salt)
+        h.update(content.encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, law_id, h):
+        """命中返回 articles 列表，未命中返回 None"""
+        row = self.conn.execute(
+            "SELECT articles FROM parse_cache WHERE law_id = ? AND hash = ?",
+            (law_id, h)
+        ).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def put(self, law_id, h, articles):
+        """暂存新结果，flush() 时批量写入"""
+        self._pending.append(
+            (law_id, h, pickle.dumps(articles, pickle.HIGHEST_PROTOCOL))
+        )
+
+    def flush(self):
+        if self._pending:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO parse_cache VALUES (?, ?, ?)",
+                self._pending
+            )
+            self.conn.commit()
+            self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
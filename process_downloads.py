@@ -2,8 +2,10 @@ import os
 import zipfile
 import sqlite3
 import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from docx import Document
+from lxml import etree
 import logging
 from datetime import datetime
 import re
@@ -12,11 +14,74 @@ import re
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 同时解压/解析的 ZIP 数
+ZIP_WORKERS = 4
+# 单个 ZIP 内并行解压的成员数 (zlib 解压时释放 GIL) 及拷贝缓冲区大小
+MEMBER_WORKERS = 4
+COPY_BUFFER = 1 << 20
+
+# 文件名中的标题和日期 (例如: 中华人民共和国公司法_20231229.docx)
+FILENAME_RE = re.compile(r"(.+)_(\d{8})\.docx")
+
+# 修正案/修改决定的常见模式: 关于修改《XXX》的决定, XXX修正案(N)
+# 按优先级依次尝试 (合并为一个交替式会改成"最左匹配优先")
+AMEND_RES = [
+    re.compile(r"关于修改《(.+)》的决定"),
+    re.compile(r"关于修改〈(.+)〉的决定"),
+    re.compile(r"(.+)修正案"),
+]
+
+
+# WordprocessingML 命名空间
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_T, _W_TAB, _W_BR, _W_CR = (_W + tag for tag in ("p", "t", "tab", "br", "cr"))
+
+
+def _docx_paragraphs(xml):
+    """按 python-docx 的 Document.paragraphs 语义逐段拼接 word/document.xml 中的文字"""
+    body = etree.fromstring(xml).find(_W + "body")
+    for p in body.iterchildren(_W_P):
+        parts = []
+        for el in p.iter(_W_T, _W_TAB, _W_BR, _W_CR):
+            if el.tag == _W_T:
+                parts.append(el.text or "")
+            elif el.tag == _W_TAB:
+                parts.append("\t")
+            else:
+                parts.append("\n")
+        yield "".join(parts)
+
+
+def extract_docx_text(docx_path):
+    """
+    从DOCX中提取文字 (模块级函数，供进程池调用)。
+    直接读取 ZIP 内的 word/document.xml，不构建 python-docx 对象模型；
+    XML 解析失败时回退到 python-docx。
+    """
+    try:
+        with zipfile.ZipFile(docx_path) as z:
+            xml = z.read("word/document.xml")
+        return '\n'.join(_docx_paragraphs(xml))
+    except Exception:
+        pass
+    try:
+        from docx import Document
+        doc = Document(docx_path)
+        full_text = []
+        for para in doc.paragraphs:
+            full_text.append(para.text)
+        return '\n'.join(full_text)
+    except Exception as e:
+        logger.error(f"解析文档 {docx_path} 出错: {e}")
+        return ""
+
+
 class LegalDataProcessor:
     def __init__(self, download_dir="downloads", db_path="legal_database.db"):
         self.download_dir = Path(download_dir)
         self.db_path = db_path
         self.temp_dir = Path("temp_processing")
+        self._known = {}  # category -> {(title, publish_date): id}
         
     def setup_db(self):
         """初始化数据库"""
@@ -39,6 +104,28 @@ class LegalDataProcessor:
         # 创建全文检索索引
         cursor.execute('CREATE VIRTUAL TABLE IF NOT EXISTS laws_fts USING fts5(title, content, content="laws", content_rowid="id")')
         
+        # external content 触发器: 增量维护 laws_fts，不再每次同步后全量 'rebuild'
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='laws_ai'")
+        if not cursor.fetchone():
+            # 旧版 schema.sql 建的触发器与下面的重复 (且 UPDATE 写法不适用于 external content)
+            for name in ("laws_fts_insert", "laws_fts_update", "laws_fts_delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.executescript('''
+                CREATE TRIGGER laws_ai AFTER INSERT ON laws BEGIN
+                    INSERT INTO laws_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+                CREATE TRIGGER laws_ad AFTER DELETE ON laws BEGIN
+                    INSERT INTO laws_fts(laws_fts, rowid, title, content) VALUES('delete', old.id, old.title, old.content);
+                END;
+                -- 仅 title/content 变化时才需重新索引 (status 等更新不触发)
+                CREATE TRIGGER laws_au AFTER UPDATE OF title, content ON laws BEGIN
+                    INSERT INTO laws_fts(laws_fts, rowid, title, content) VALUES('delete', old.id, old.title, old.content);
+                    INSERT INTO laws_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+                END;
+            ''')
+            # 首次启用触发器时全量对齐一次，之后的 'delete' 才能与索引内容一致
+            cursor.execute("INSERT INTO laws_fts(laws_fts) VALUES('rebuild')")
+        
         # 数据库迁移: 添加新列 (如果不存在)
         try:
             cursor.execute("ALTER TABLE laws ADD COLUMN is_amendment INTEGER DEFAULT 0")
@@ -49,97 +136,128 @@ class LegalDataProcessor:
             cursor.execute("ALTER TABLE laws ADD COLUMN base_law_title TEXT")
         except sqlite3.OperationalError:
             pass # 已存在
+        
+        # 按分类加载 (title, publish_date) -> id 的判重查询，及修正案按基础法律标题回查
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_laws_cat_title_date ON laws(category, title, publish_date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_laws_base ON laws(base_law_title)")
             
         conn.commit()
         conn.close()
 
-    def extract_docx_text(self, docx_path):
-        """从DOCX中提取文字"""
+    def read_zip(self, zip_path, executor):
+        """
+        解压单个ZIP并在进程池中并行提取全部 DOCX 文本，返回 [(文件名, 正文)]。
+        每个 ZIP 使用独立的临时目录，可在多个线程中同时调用；出错返回 None。
+        """
+        logger.info(f"正在解压 ZIP: {zip_path}")
+        temp_dir = self.temp_dir.with_name(f"{self.temp_dir.name}_{uuid.uuid4().hex}")
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        
         try:
-            doc = Document(docx_path)
-            full_text = []
-            for para in doc.paragraphs:
-                full_text.append(para.text)
-            return '\n'.join(full_text)
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                # 只解压顶层的 .docx (与原先 glob("*.docx") 的范围一致)，1 MB 缓冲流式写出
+                members = [
+                    info for info in zip_ref.infolist()
+                    if not info.is_dir() and '/' not in info.filename and info.filename.endswith('.docx')
+                ]
+                with ThreadPoolExecutor(max_workers=MEMBER_WORKERS) as pool:
+                    docx_files = list(pool.map(
+                        lambda info: self._extract_member(zip_ref, info, temp_dir), members
+                    ))
+            
+            texts = executor.map(extract_docx_text, docx_files, chunksize=4)
+            return [(docx_file.name, content) for docx_file, content in zip(docx_files, texts)]
+            
         except Exception as e:
-            logger.error(f"解析文档 {docx_path} 出错: {e}")
-            return ""
+            logger.error(f"处理 ZIP {zip_path} 出错: {e}")
+            return None
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def known_laws(self, cursor, category):
+        """某分类下已入库法律的 {(title, publish_date): id}，每个分类只查询一次"""
+        known = self._known.get(category)
+        if known is None:
+            known = {}
+            cursor.execute("SELECT title, publish_date, id FROM laws WHERE category=? ORDER BY id", (category,))
+            for title, publish_date, law_id in cursor:
+                known.setdefault((title, publish_date), law_id)
+            self._known[category] = known
+        return known
+
+    @staticmethod
+    def _extract_member(zip_ref, info, temp_dir):
+        """将单个 ZIP 成员流式写入临时目录，返回写出的路径"""
+        out = temp_dir / Path(info.filename).name
+        with zip_ref.open(info) as src, open(out, 'wb', buffering=COPY_BUFFER) as dst:
+            shutil.copyfileobj(src, dst, length=COPY_BUFFER)
+        return out
 
-    def process_zip(self, zip_path, category, status):
-        """处理单个ZIP文件"""
+    def process_zip(self, conn, zip_path, category, status, docs):
+        """将单个ZIP中已提取的文档写入数据库 (仅在主线程调用)"""
         logger.info(f"正在处理 ZIP: {zip_path}")
-        if self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir)
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
         
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.temp_dir)
-            
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            known = self.known_laws(cursor, category)
+            insert_rows = []
+            update_rows = []
+            pending = set()  # 本批待插入的 (title, publish_date)，避免同一 ZIP 内重复插入
             
-            for docx_file in self.temp_dir.glob("*.docx"):
+            for file_name, content in docs:
                 # 解析文件名获取标题和日期 (例如: 中华人民共和国公司法_20231229.docx)
-                match = re.match(r"(.+)_(\d{8})\.docx", docx_file.name)
+                match = FILENAME_RE.match(file_name)
                 if match:
                     title = match.group(1)
                     publish_date = f"{match.group(2)[:4]}-{match.group(2)[4:6]}-{match.group(2)[6:]}"
                 else:
-                    title = docx_file.stem
+                    title = Path(file_name).stem
                     publish_date = "Unknown"
                 
-                content = self.extract_docx_text(docx_file)
-                
                 # 检查是否已存在 (避免重复)
-                cursor.execute("SELECT id FROM laws WHERE title=? AND publish_date=? AND category=?", 
-                             (title, publish_date, category))
-                existing = cursor.fetchone()
+                existing = known.get((title, publish_date))
                 
                 # 识别修正案/修改决定
                 is_amendment = 0
                 base_law_title = None
                 
-                # 常见模式: 关于修改《XXX》的决定, XXX修正案(N)
-                amend_patterns = [
-                    r"关于修改《(.+)》的决定",
-                    r"关于修改〈(.+)〉的决定",
-                    r"(.+)修正案"
-                ]
-                for pattern in amend_patterns:
-                    amend_match = re.search(pattern, title)
+                for pattern in AMEND_RES:
+                    amend_match = pattern.search(title)
                     if amend_match:
                         is_amendment = 1
                         base_law_title = amend_match.group(1)
                         break
 
+                if (title, publish_date) in pending:
+                    continue
                 if not existing:
-                    cursor.execute('''
-                        INSERT INTO laws (title, content, publish_date, category, status, file_name, is_amendment, base_law_title)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (title, content, publish_date, category, status, docx_file.name, is_amendment, base_law_title))
+                    pending.add((title, publish_date))
+                    insert_rows.append((title, content, publish_date, category, status, file_name, is_amendment, base_law_title))
                     logger.info(f"已添加到数据库: {title} {'(修正案)' if is_amendment else ''}")
                 else:
                     # 如果状态改变，可以更新
-                    cursor.execute("UPDATE laws SET status=?, is_amendment=?, base_law_title=? WHERE id=?", 
-                                 (status, is_amendment, base_law_title, existing[0]))
+                    update_rows.append((status, is_amendment, base_law_title, existing))
             
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM laws")
+            last_id = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO laws (title, content, publish_date, category, status, file_name, is_amendment, base_law_title)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', insert_rows)
+            cursor.executemany("UPDATE laws SET status=?, is_amendment=?, base_law_title=? WHERE id=?", update_rows)
             conn.commit()
-            # 更新FTS全文检索引索
-            cursor.execute("INSERT INTO laws_fts(laws_fts) VALUES('rebuild')")
-            conn.commit()
-            conn.close()
+            
+            # 新插入的行补入缓存，供同分类后续 ZIP 判重
+            cursor.execute("SELECT title, publish_date, id FROM laws WHERE id > ? AND category=?", (last_id, category))
+            for title, publish_date, law_id in cursor:
+                known.setdefault((title, publish_date), law_id)
             
         except Exception as e:
+            conn.rollback()
             logger.error(f"处理 ZIP {zip_path} 出错: {e}")
-        finally:
-            if self.temp_dir.exists():
-                shutil.rmtree(self.temp_dir)
 
-    def run(self):
-        """遍历整个下载目录进行处理"""
-        self.setup_db()
-        
+    def iter_zips(self):
+        """遍历下载目录，产出 (zip_path, category, status)"""
         # 遍历分类文件夹
         for category_dir in self.download_dir.iterdir():
             if not category_dir.is_dir():
@@ -151,13 +269,42 @@ class LegalDataProcessor:
             # 注意: 手动下载或者未指定状态的默认归为 "有效"
             for item in category_dir.iterdir():
                 if item.is_file() and item.suffix == ".zip":
-                    self.process_zip(item, category, "有效")
+                    yield item, category, "有效"
                 
                 # 2. 处理子文件夹 (对应的状态: 尚未生效, 已废止等)
                 elif item.is_dir():
                     status = item.name
                     for zip_path in item.glob("*.zip"):
-                        self.process_zip(zip_path, category, status)
+                        yield zip_path, category, status
+
+    def run(self):
+        """遍历整个下载目录进行处理"""
+        self.setup_db()
+        
+        # 整个同步过程共用一个连接；批量写入使用 WAL + NORMAL，避免每次提交都 fsync 两次
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-200000")
+        
+        # DOCX 解析是 CPU 密集型，交给进程池；多个 ZIP 由线程并发解压/分发。
+        # 数据库写入仍按原遍历顺序在主线程串行执行。
+        jobs = list(self.iter_zips())
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as procs, \
+                ThreadPoolExecutor(max_workers=ZIP_WORKERS) as threads:
+            futures = [threads.submit(self.read_zip, zip_path, procs) for zip_path, _, _ in jobs]
+            for (zip_path, category, status), future in zip(jobs, futures):
+                docs = future.result()
+                if docs is not None:
+                    self.process_zip(conn, zip_path, category, status, docs)
+
+        # laws_fts 已由触发器增量维护，最后合并一次索引段
+        conn.execute("INSERT INTO laws_fts(laws_fts) VALUES('optimize')")
+        conn.commit()
+        # 更新查询规划统计信息
+        conn.execute("ANALYZE")
+        conn.close()
 
         logger.info("数据同步完成！")
 
@@ -10,74 +10,91 @@ Query Rewriter - 查询重写/扩展模块 (E2)
 
 import sqlite3
 import logging
+import threading
 from pathlib import Path
 from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 DB_PATH = Path(__file__).parent / "legal_database.db"
 
-@lru_cache(maxsize=1024)
-def expand_query(query: str) -> str:
+# 模块级共享连接 (跨线程使用，由锁串行化；唯一的写入是 L2 缓存写回)
+_conn = None
+_conn_lock = threading.Lock()
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    return _conn
+
+# 持久化扩展缓存 (L2，由 migrations/009 建表): 跨进程/重启共享，lru_cache 仍作为进程内 L1。
+# 缓存行的 version 与 query_expansion_version 一致才算命中；该版本由别名表、同义词表
+# 和 laws 的写入触发器递增，任一相关数据变化后旧条目整体失效
+_CACHE_LOOKUP_SQL = """
+    SELECT v.version, c.expanded
+    FROM query_expansion_version v
+    LEFT JOIN query_expansion_cache c ON c.query = ? AND c.version = v.version
+"""
+_CACHE_WRITE_TIMEOUT_MS = 100  # 写回时最多等锁 100ms，拿不到就放弃，不拖慢查询
+_DEFAULT_TIMEOUT_MS = 5000     # sqlite3.connect 默认 timeout=5.0
+_cache_ready = None  # 是否已运行 009 迁移 (每个进程检查一次)
+
+def _cache_available(conn):
+    global _cache_ready
+    if _cache_ready is None:
+        _cache_ready = conn.execute("""
+            SELECT count(*) FROM sqlite_master
+            WHERE type = 'table' AND name IN ('query_expansion_cache', 'query_expansion_version')
+        """).fetchone()[0] == 2
+    return _cache_ready
+
+def _cache_put(conn, query, expanded, version):
     """
-    对查询词进行扩展。
-    返回扩展后的查询字符串（例如 "A OR B"）。
+    写回 L2。version 是计算前读到的版本: 计算期间若有写入，版本已递增，
+    这一行不会再被命中，因此不会缓存过期结果。数据库只读或被占用时跳过。
     """
-    if not query:
-        return ""
-    
-    # 1. 基础清理
-    query = query.strip()
-    expanded_terms = {query}
-    
     try:
-        with sqlite3.connect(str(DB_PATH)) as conn:
-            cursor = conn.cursor()
-            
-            # 2. 别名扩展 (Law Aliases)
-            # 查 alias -> law_id -> title
-            # 场景: 用户搜 "民法典", 扩展为 "中华人民共和国民法典"
-            cursor.execute("""
-                SELECT l.title 
-                FROM law_aliases a 
-                JOIN laws l ON a.law_id = l.id 
-                WHERE a.alias = ? AND l.status = '有效'
-            """, (query,))
-            rows = cursor.fetchall()
-            for r in rows:
-                expanded_terms.add(r[0])
-            
-            # 查 title -> aliases
-            # 场景: 用户搜 "中华人民共和国民法典", 扩展为 "民法典"
-            cursor.execute("""
-                SELECT a.alias 
-                FROM laws l 
-                JOIN law_aliases a ON l.id = a.law_id 
-                WHERE l.title = ?
-            """, (query,))
-            rows = cursor.fetchall()
-            for r in rows:
-                expanded_terms.add(r[0])
+        conn.execute(f"PRAGMA busy_timeout = {_CACHE_WRITE_TIMEOUT_MS}")
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO query_expansion_cache (query, expanded, version) VALUES (?, ?, ?)",
+                (query, expanded, version)
+            )
+    except sqlite3.Error as e:
+        logger.debug(f"query_expansion_cache write skipped: {e}")
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {_DEFAULT_TIMEOUT_MS}")
 
-            # 3. 概念同义词扩展 (Concept Synonyms)
-            # 查 term -> canonical_term
-            # 场景: "债权人撤销权" -> "撤销权" (标准概念)
-            cursor.execute("SELECT canonical_term FROM concept_synonyms WHERE term = ?", (query,))
-            row = cursor.fetchone()
-            if row:
-                expanded_terms.add(row[0])
-                # 还可以进一步查标准概念的同义词? 暂时不递归，避免发散
-            
-            # 查 canonical_term -> terms
-            # 场景: "撤销权" -> "债权人撤销权", "合同撤销权"
-            cursor.execute("SELECT term FROM concept_synonyms WHERE canonical_term = ?", (query,))
-            rows = cursor.fetchall()
-            for r in rows:
-                expanded_terms.add(r[0])
+# 别名/同义词四个方向一次查出 (依次绑定同一个 query)
+# term -> canonical_term 仅取一条，不递归，避免发散
+_EXPAND_SQL = """
+    SELECT l.title
+    FROM law_aliases a
+    JOIN laws l ON a.law_id = l.id
+    WHERE a.alias = ? AND l.status = '有效'
+    UNION ALL
+    SELECT a.alias
+    FROM laws l
+    JOIN law_aliases a ON l.id = a.law_id
+    WHERE l.title = ?
+    UNION ALL
+    SELECT * FROM (SELECT canonical_term FROM concept_synonyms WHERE term = ? LIMIT 1)
+    UNION ALL
+    SELECT term FROM concept_synonyms WHERE canonical_term = ?
+"""
 
-    except Exception as e:
-        logger.error(f"Query expansion failed: {e}")
-        return query
+def _expand_terms(cursor, query):
+    """
+    查询别名表和同义词表，返回扩展词集合:
+    2. 别名扩展: "民法典" <-> "中华人民共和国民法典"
+    3. 概念同义词扩展: "债权人撤销权" -> "撤销权", "撤销权" -> "债权人撤销权", "合同撤销权"
+    """
+    expanded_terms = {query}
+    cursor.execute(_EXPAND_SQL, (query,) * 4)
+    expanded_terms.update(r[0] for r in cursor.fetchall())
+    return expanded_terms
 
+def _build_or_query(query, expanded_terms):
     # 4. 构建 OR 查询
     # 如果扩展后有多个词，用 OR 连接
     # 注意: FTS5 的 OR 语法是 "A OR B"
@@ -93,6 +110,37 @@ def expand_query(query: str) -> str:
     safe_terms = [f'"{t.replace(chr(34), "")}"' for t in unique_terms]
     return " OR ".join(safe_terms)
 
+@lru_cache(maxsize=1024)
+def expand_query(query: str) -> str:
+    """
+    对查询词进行扩展。
+    返回扩展后的查询字符串（例如 "A OR B"）。
+    """
+    if not query:
+        return ""
+    
+    # 1. 基础清理
+    query = query.strip()
+    
+    try:
+        with _conn_lock:
+            conn = _get_conn()
+            version = None
+            if _cache_available(conn):
+                row = conn.execute(_CACHE_LOOKUP_SQL, (query,)).fetchone()
+                if row is not None:
+                    version, hit = row
+                    if hit is not None:
+                        return hit
+            expanded = _build_or_query(query, _expand_terms(conn.cursor(), query))
+            if version is not None:
+                _cache_put(conn, query, expanded, version)
+    except Exception as e:
+        logger.error(f"Query expansion failed: {e}")
+        return query
+
+    return expanded
+
 if __name__ == "__main__":
     # Test
     print(expand_query("民法典"))
@@ -3,7 +3,7 @@
 VectorDB — 法条向量检索引擎 (V2)
 
 使用 sentence-transformers 将法条编码为 768 维向量，
-存储在 SQLite 的 article_embeddings 表中。
+以 float16 存储在 SQLite 的 article_embeddings 表中 (旧的 float32 BLOB 仍可读取)。
 查询时加载全部向量到内存，用 numpy 矩阵运算实现毫秒级检索。
 
 性能:
@@ -12,20 +12,81 @@ VectorDB — 法条向量检索引擎 (V2)
 - 单次查询: <100ms
 """
 
+import os
+import re
+import json
 import sqlite3
 import numpy as np
 import logging
 import sys
 import threading
+import queue
+from concurrent.futures import Future
+from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# faiss (可选): SIMD 内积 + 堆选 Top-K；未安装时退回 numpy GEMV
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# pyahocorasick (可选): 核心法律多模式匹配；未安装时退回正则交替
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # ========== Embedding 模型 ==========
 _model = None
 MODEL_NAME = 'BAAI/bge-base-zh-v1.5'
 EMBEDDING_DIM = 768
 
+# int8 量化: 每行按 max|x|/127 对称量化，内存降为 1/4 (~23 MB)。
+# NumPy 的整数矩阵乘不走 BLAS，因此检索时分块反量化为 float32 再做 GEMV，
+# 以少量 CPU 换内存；默认关闭，内存受限时设 VECTOR_INT8=1 启用。
+QUANTIZE_INT8 = os.environ.get("VECTOR_INT8") == "1"
+INT8_BLOCK_ROWS = 4096  # 每块反量化 4096 × 768 × 4B ≈ 12 MB
+
+# 核心法律 (+15% 加权)
+CORE_LAWS = ["中华人民共和国民法典", "中华人民共和国公司法", "中华人民共和国刑法", "中华人民共和国劳动法", "中华人民共和国劳动合同法"]
+
+
+def _build_core_law_matcher():
+    """构建核心法律匹配器: 单遍扫描标题，命中任一 CORE_LAWS 返回 True"""
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for core in CORE_LAWS:
+            automaton.add_word(core, core)
+        automaton.make_automaton()
+        return lambda title: next(automaton.iter(title), None) is not None
+    pattern = re.compile("|".join(map(re.escape, CORE_LAWS)))
+    return lambda title: pattern.search(title) is not None
+
+
+is_core_law = _build_core_law_matcher()
+
+# faiss 索引存放加权后的向量 (每行 × Boost)，内积即最终得分，扁平索引的 Top-K 与 numpy 路径一致。
+# 语料很大时设 VECTOR_HNSW=1 改用近似的 HNSW 图索引，此时多取 limit × FAISS_OVERSAMPLE 个候选提高召回。
+FAISS_OVERSAMPLE = 4
+USE_HNSW = os.environ.get("VECTOR_HNSW") == "1"
+HNSW_M = 32
+HNSW_EF_SEARCH = 64
+
+# 查询合批: 已有并发查询排队时，再等 BATCH_WINDOW 秒凑成一次矩阵乘，每批最多 BATCH_MAX 条
+BATCH_WINDOW = 0.01
+BATCH_MAX = 32
+
+# ONNX 查询编码 (可选): 设 USE_ONNX=1 后 encode_text 改用 onnxruntime 运行
+# int8 动态量化的导出模型 (python vector_db.py --export-onnx 生成)，
+# 绕开 PyTorch eager 推理。索引构建 (encode_batch) 仍使用 sentence-transformers。
+USE_ONNX = os.environ.get("USE_ONNX") == "1"
+ONNX_MODEL_DIR = Path(os.environ.get("ONNX_MODEL_DIR", "bge-onnx"))
+ONNX_MODEL_FILE = "model_int8.onnx"
+_onnx = None  # (tokenizer, session)
+
 
 def get_model():
     """懒加载 embedding 模型 (全局单例)"""
@@ -40,8 +101,49 @@ def get_model():
     return _model
 
 
+def get_onnx_model():
+    """懒加载 ONNX 编码器 (全局单例)，返回 (tokenizer, session)"""
+    global _onnx
+    if _onnx is None:
+        import time
+        t0 = time.time()
+        logger.info(f"Loading ONNX embedding model: {ONNX_MODEL_DIR / ONNX_MODEL_FILE}...")
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = os.cpu_count()
+        session = ort.InferenceSession(str(ONNX_MODEL_DIR / ONNX_MODEL_FILE), opts,
+                                       providers=['CPUExecutionProvider'])
+        _onnx = (AutoTokenizer.from_pretrained(str(ONNX_MODEL_DIR)), session)
+        logger.info(f"ONNX embedding model loaded in {time.time()-t0:.1f}s.")
+    return _onnx
+
+
+def _encode_onnx(text: str) -> np.ndarray:
+    """ONNX 推理 + [CLS] 池化 + L2 归一化 (与 bge 的 sentence-transformers 配置一致)"""
+    tokenizer, session = get_onnx_model()
+    enc = tokenizer(text, truncation=True, max_length=512, return_tensors='np')
+    feed = {i.name: enc[i.name].astype(np.int64) for i in session.get_inputs() if i.name in enc}
+    hidden = session.run(None, feed)[0]  # shape: (1, seq_len, 768)
+    vec = hidden[0, 0].astype(np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def export_onnx_model(out_dir: Path = ONNX_MODEL_DIR):
+    """一次性导出: MODEL_NAME -> ONNX (feature-extraction) -> int8 动态量化"""
+    from optimum.exporters.onnx import main_export
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    out_dir = Path(out_dir)
+    main_export(MODEL_NAME, output=out_dir, task='feature-extraction')
+    quantize_dynamic(str(out_dir / 'model.onnx'), str(out_dir / ONNX_MODEL_FILE),
+                     weight_type=QuantType.QInt8)
+    logger.info(f"ONNX model exported to {out_dir / ONNX_MODEL_FILE}")
+
+
 def encode_text(text: str) -> np.ndarray:
     """将文本编码为归一化向量"""
+    if USE_ONNX:
+        return _encode_onnx(text)
     model = get_model()
     return model.encode(text, normalize_embeddings=True)
 
@@ -55,6 +157,11 @@ def encode_batch(texts: List[str], batch_size: int = 64) -> np.ndarray:
 
 # ========== 数据库操作 ==========
 
+def _blob_dtype(blob: bytes):
+    """embedding BLOB 的存储精度: 768 × 2B 为 float16，768 × 4B 为旧版 float32"""
+    return np.float16 if len(blob) == EMBEDDING_DIM * 2 else np.float32
+
+
 def create_embeddings_table(conn: sqlite3.Connection):
     """创建 article_embeddings 表 (幂等)"""
     conn.execute("""
@@ -67,23 +174,52 @@ def create_embeddings_table(conn: sqlite3.Connection):
     conn.commit()
 
 
+def _cache_dir_for(db_path) -> Path:
+    """VectorIndex 磁盘缓存目录: 与数据库同名的 .vecidx 目录"""
+    return Path(db_path).with_suffix('.vecidx')
+
+
+def invalidate_vector_cache(conn: sqlite3.Connection):
+    """删除 conn 所连数据库的向量缓存 meta.json，使下次加载回源 SQLite 重建"""
+    db_file = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main'), '')
+    if not db_file:  # 内存数据库
+        return
+    try:
+        (_cache_dir_for(db_file) / 'meta.json').unlink()
+    except FileNotFoundError:
+        pass
+
+
 def insert_embeddings(conn: sqlite3.Connection, article_ids: List[int],
                       embeddings: np.ndarray):
-    """批量插入 embedding"""
-    data = []
-    for i, aid in enumerate(article_ids):
-        blob = embeddings[i].astype(np.float32).tobytes()
-        data.append((aid, blob))
-
-    conn.executemany(
-        "INSERT OR REPLACE INTO article_embeddings (article_id, embedding) VALUES (?, ?)",
-        data
-    )
-    conn.commit()
+    """批量插入 embedding (单个事务，期间 synchronous=NORMAL)，并使向量缓存失效"""
+    # 一次性转为 C 连续 float16 (归一化向量精度足够，BLOB 减半)，逐行 tobytes 不再各自 astype 拷贝
+    embs = np.ascontiguousarray(embeddings, dtype=np.float16)
+    prev_sync = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA synchronous=NORMAL")
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO article_embeddings (article_id, embedding) VALUES (?, ?)",
+                ((aid, embs[i].tobytes()) for i, aid in enumerate(article_ids))
+            )
+    finally:
+        conn.execute(f"PRAGMA synchronous={int(prev_sync)}")
+    # INSERT OR REPLACE 覆盖已有向量时行数与 max(rowid) 不变，缓存签名识别不到
+    invalidate_vector_cache(conn)
 
 
 # ========== 内存缓存 (核心性能优化) ==========
 
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    """降序 Top-K 下标: argpartition O(N) 选出 K 个，再只对这 K 个排序"""
+    k = min(limit, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
 class VectorIndex:
     """
     内存向量索引。
@@ -96,11 +232,17 @@ class VectorIndex:
         self._article_ids: Optional[np.ndarray] = None
         self._matrix: Optional[np.ndarray] = None  # shape: (N, 768)
         self._boost_factors: Optional[np.ndarray] = None # shape: (N,)
+        self._matrix_i8: Optional[np.ndarray] = None  # shape: (N, 768), 仅 int8 模式
+        self._scales: Optional[np.ndarray] = None     # shape: (N,), 仅 int8 模式
+        self._faiss = None  # faiss 索引, 仅 float32 模式且已安装 faiss
+        self._batcher: Optional["_BatchedSearcher"] = None
+        # 磁盘缓存: vectors.npy / ids.npy / boosts.npy + meta.json，数据库未变时 mmap 加载
+        self.cache_dir = _cache_dir_for(db_path)
         self._loaded = False
         self._lock = threading.Lock()
 
-    def _load(self):
-        """从 SQLite 加载向量及元数据"""
+    def _load(self, use_cache: bool = True):
+        """从 SQLite 加载向量及元数据 (双重检查锁，整个加载过程持锁)；use_cache=False 时忽略并重建磁盘缓存"""
         if self._loaded:
             return
 
@@ -111,101 +253,302 @@ class VectorIndex:
             import time
             t0 = time.time()
             logger.info("Loading vector index and metadata into memory...")
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            # 联合查询: 向量 + 长度 + 法律标题
-            cursor.execute("""
-                SELECT ae.article_id, ae.embedding, length(la.content), l.title
-                FROM article_embeddings ae
-                JOIN law_articles la ON ae.article_id = la.id
-                JOIN laws l ON la.law_id = l.id
-            """)
-            rows = cursor.fetchall()
-
-            if not rows:
-                logger.warning("No embeddings found.")
-                # init empty
-                self._article_ids = np.array([], dtype=np.int64)
-                self._matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
-                self._boost_factors = np.ones(0, dtype=np.float32)
-                self._loaded = True
-                return
-
-            ids = []
-            vecs = []
-            boosts = []
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.arraysize = 1000
+                # 缓存键、计数与读取在同一读事务中，保证三者对应同一份数据
+                cursor.execute("BEGIN")
+                signature = self._source_signature(cursor)
+                if use_cache and self._load_cache(signature):
+                    self._finish_load(t0)
+                    return
+                cursor.execute("""
+                    SELECT count(*)
+                    FROM article_embeddings ae
+                    JOIN law_articles la ON ae.article_id = la.id
+                    JOIN laws l ON la.law_id = l.id
+                """)
+                n = cursor.fetchone()[0]
+
+                if n == 0:
+                    logger.warning("No embeddings found.")
+                    # init empty
+                    self._article_ids = np.array([], dtype=np.int64)
+                    self._matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+                    self._boost_factors = np.ones(0, dtype=np.float32)
+                    self._loaded = True
+                    return
+
+                # 联合查询: 向量 + 长度 + 法律标题
+                # 逐批读取，向量直接拷入预分配矩阵，不再保留 N 个小数组再 vstack
+                cursor.execute("""
+                    SELECT ae.article_id, ae.embedding, ifnull(length(la.content), 0), l.title
+                    FROM article_embeddings ae
+                    JOIN law_articles la ON ae.article_id = la.id
+                    JOIN laws l ON la.law_id = l.id
+                """)
+                ids = np.empty(n, dtype=np.int64)
+                matrix = np.empty((n, EMBEDDING_DIM), dtype=np.float32)
+                lengths = np.empty(n, dtype=np.int64)
+                titles = []
+
+                i = 0
+                while True:
+                    rows = cursor.fetchmany()
+                    if not rows:
+                        break
+                    for aid, blob, length, title in rows:
+                        ids[i] = aid
+                        # Vector (按 BLOB 长度区分 float16 / 旧版 float32，写入时升为 float32)
+                        matrix[i] = np.frombuffer(blob, dtype=_blob_dtype(blob))
+                        lengths[i] = length
+                        titles.append(title)
+                        i += 1
+
+                self._article_ids = ids
+                self._matrix = matrix  # shape: (N, 768)
+                self._boost_factors = self._compute_boosts(titles, lengths)
+                self._build_cache(signature)
+                self._finish_load(t0)
             
-            CORE_LAWS = ["中华人民共和国民法典", "中华人民共和国公司法", "中华人民共和国刑法", "中华人民共和国劳动法", "中华人民共和国劳动合同法"]
-
-            for aid, blob, length, title in rows:
-                ids.append(aid)
-                # Vector
-                vec = np.frombuffer(blob, dtype=np.float32)
-                vecs.append(vec)
-                
-                # Calculate Boost Factor
-                factor = 1.0
-                
-                # 1. Core Law Boost (+15%)
-                if any(core in title for core in CORE_LAWS):
-                    factor *= 1.15
-                    
-                # 2. Length Penalty (Short procedural articles)
-                # "Effective Date" clauses typically < 50 chars
-                if length < 50:
-                    factor *= 0.5
-                elif length < 20: 
-                    factor *= 0.1
-
-                boosts.append(factor)
-
-            self._article_ids = np.array(ids, dtype=np.int64)
-            self._matrix = np.vstack(vecs)  # shape: (N, 768)
-            self._boost_factors = np.array(boosts, dtype=np.float32)
-            self._loaded = True
-
-            logger.info(f"Vector index loaded in {time.time()-t0:.1f}s: {len(ids)} articles, {self._matrix.nbytes/1024/1024:.1f} MB")
-            
-        finally:
-            conn.close()
+            finally:
+                conn.close()
 
-    def search(self, query_text: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def _finish_load(self, t0: float):
+        """矩阵就绪后的收尾: 量化 / 建 faiss 索引，标记已加载"""
+        import time
+        index = None
+        if QUANTIZE_INT8:
+            self._quantize()
+        elif faiss is not None and (USE_HNSW or not isinstance(self._matrix, np.memmap)):
+            # 扁平索引要把整个矩阵拷入 faiss: 命中 mmap 缓存时不建，直接在多进程共享的页缓存上做 GEMM；
+            # HNSW 必须持有自己的数据副本，仍然构建 (每个进程多占一份矩阵内存)
+            index = self._build_faiss()
+        self._faiss = index
+        self._loaded = True
+
+        nbytes = self._matrix_i8.nbytes if self._matrix is None else self._matrix.nbytes
+        logger.info(f"Vector index loaded in {time.time()-t0:.1f}s: {len(self._article_ids)} articles, {nbytes/1024/1024:.1f} MB")
+
+    @staticmethod
+    def _source_signature(cursor) -> str:
         """
-        语义搜索 (带加权)。
+        由参与加载的各表行数与最大 rowid 组成的数据签名，用作缓存键。
+        原地修改 (重新生成向量、改标题或正文) 不改变签名: insert_embeddings 会删除缓存，
+        其余写入后需调用 reload() 重建。
+        """
+        cursor.execute("""
+            SELECT (SELECT count(*) || '.' || ifnull(max(rowid), 0) FROM article_embeddings)
+                || '/' || (SELECT count(*) || '.' || ifnull(max(rowid), 0) FROM law_articles)
+                || '/' || (SELECT count(*) || '.' || ifnull(max(rowid), 0) FROM laws)
+        """)
+        return cursor.fetchone()[0]
+
+    def _load_cache(self, signature: str) -> bool:
+        """数据签名与缓存一致时，以 mmap 方式加载缓存，成功返回 True"""
+        try:
+            meta = json.loads((self.cache_dir / 'meta.json').read_text(encoding='utf-8'))
+            if meta['source_signature'] != signature:
+                return False
+            matrix = np.load(self.cache_dir / 'vectors.npy', mmap_mode='r')
+            ids = np.load(self.cache_dir / 'ids.npy')
+            boosts = np.load(self.cache_dir / 'boosts.npy')
+        except (OSError, ValueError, KeyError):
+            return False
+        if not (len(matrix) == len(ids) == len(boosts) == meta['rows']):
+            return False
+        self._matrix, self._article_ids, self._boost_factors = matrix, ids, boosts
+        logger.info(f"Vector index cache hit: {self.cache_dir}")
+        return True
+
+    def _build_cache(self, signature: str):
+        """将矩阵与元数据写入磁盘缓存 (先写临时文件再替换，meta.json 最后写入)"""
+        try:
+            self.cache_dir.mkdir(exist_ok=True)
+            for name, arr in (('vectors.npy', self._matrix), ('ids.npy', self._article_ids),
+                              ('boosts.npy', self._boost_factors)):
+                tmp = self.cache_dir / f"{name}.tmp"
+                with open(tmp, 'wb') as f:
+                    np.save(f, arr)
+                os.replace(tmp, self.cache_dir / name)
+            meta = {'rows': len(self._article_ids), 'source_signature': signature}
+            (self.cache_dir / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+        except OSError as e:
+            logger.warning(f"Failed to write vector index cache: {e}")
+
+    @staticmethod
+    def _compute_boosts(titles: List[str], lengths: np.ndarray) -> np.ndarray:
+        """按法律标题和条文长度计算加权系数, shape: (N,)"""
+        # 1. Core Law Boost (+15%)
+        # 同一部法律的条文共用标题，只对去重后的标题做匹配再按下标展开
+        unique_titles = {}
+        inverse = np.fromiter((unique_titles.setdefault(t, len(unique_titles)) for t in titles),
+                              dtype=np.intp, count=len(titles))
+        unique_mask = np.fromiter((is_core_law(t) for t in unique_titles),
+                                  dtype=np.bool_, count=len(unique_titles))
+        core_mask = unique_mask[inverse]
+        factor = np.where(core_mask, np.float32(1.15), np.float32(1.0))
+        # 2. Length Penalty (Short procedural articles)
+        # "Effective Date" clauses typically < 50 chars; very short ones (< 20) are cut harder
+        factor *= np.where(lengths < 20, np.float32(0.1),
+                           np.where(lengths < 50, np.float32(0.5), np.float32(1.0)))
+        return factor.astype(np.float32)
+
+    def _quantize(self):
+        """将 float32 矩阵替换为 int8 矩阵 + 每行 float32 缩放系数"""
+        scales = np.abs(self._matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0  # 全零行
+        self._matrix_i8 = np.round(self._matrix / scales[:, None]).astype(np.int8)
+        self._scales = scales.astype(np.float32)
+        self._matrix = None
+
+    def _build_faiss(self):
+        """在加权后的 float32 矩阵上建立 faiss 内积索引 (向量已归一化，内积即 Cosine × Boost)"""
+        if USE_HNSW:
+            index = faiss.IndexHNSWFlat(EMBEDDING_DIM, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        else:
+            index = faiss.IndexFlatIP(EMBEDDING_DIM)
+        index.add(np.ascontiguousarray(self._matrix * self._boost_factors[:, None], dtype=np.float32))
+        return index
+
+    def _raw_scores(self, Q: np.ndarray) -> np.ndarray:
+        """原始相似度 (Cosine)，Q shape: (768, B)，返回 shape: (N, B)"""
+        if self._matrix is not None:
+            return self._matrix @ Q
+        Q = Q.astype(np.float32, copy=False)
+        out = np.empty((len(self._matrix_i8), Q.shape[1]), dtype=np.float32)
+        for start in range(0, len(out), INT8_BLOCK_ROWS):
+            block = self._matrix_i8[start:start + INT8_BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32) @ Q
+        return out * self._scales[:, None]
+
+    def _search_batch(self, query_vecs: List[np.ndarray], limits: List[int]) -> List[List[Dict[str, Any]]]:
+        """
+        一批查询向量一次检索: 矩阵只读一遍 (BLAS-3 GEMM 代替逐条 GEMV)。
         Score = Cosine_Similarity * Boost_Factor
         """
+        Q = np.stack(query_vecs).astype(np.float32)  # shape: (B, 768)
+        batch = []
+        if self._faiss is not None:
+            # 1. faiss 直接按加权分取 Top-K (HNSW 为近似检索，多取候选)
+            k = max(max(limits), 1) * (FAISS_OVERSAMPLE if USE_HNSW else 1)
+            D, I = self._faiss.search(Q, min(k, len(self._article_ids)))
+            for j, limit in enumerate(limits):
+                valid = I[j] >= 0  # HNSW 候选不足时以 -1 填充
+                cand = I[j][valid]
+                final_scores = D[j][valid]
+                # 2. 候选内取 Top-K，原始相似度由加权分除以 Boost 还原
+                order = _top_k(final_scores, limit)
+                top = cand[order]
+                batch.append((top, final_scores[order], final_scores[order] / self._boost_factors[top]))
+        else:
+            # 1. 计算原始相似度 (Cosine)
+            raw_all = self._raw_scores(Q.T)  # shape: (N, B)
+
+            # 2. 应用加权
+            final_all = raw_all * self._boost_factors[:, None]
+
+            # 3. Top-K (逐列)
+            for j, limit in enumerate(limits):
+                top_indices = _top_k(final_all[:, j], limit)
+                batch.append((top_indices, final_all[top_indices, j], raw_all[top_indices, j]))
+
+        out = []
+        for top_indices, top_final, top_raw in batch:
+            # 整体转为 Python 标量，避免逐条 int()/float()
+            ids = self._article_ids[top_indices].tolist()
+            results = [
+                {'article_id': aid, 'score': score, 'raw_score': raw}  # raw_score: Debug info
+                for aid, score, raw in zip(ids, top_final.tolist(), top_raw.tolist())
+            ]
+            out.append(results)
+        return out
+
+    def search_async(self, query_text: str, limit: int = 10) -> Future:
+        """
+        语义搜索 (带加权)，返回 Future。
+        查询在调用线程中编码，检索交给 _BatchedSearcher 与并发到达的查询合批。
+        """
         self._load()
 
         if len(self._article_ids) == 0:
-            return []
+            future = Future()
+            future.set_result([])
+            return future
 
         # 编码查询
         query_vec = encode_text(query_text)  # shape: (768,)
 
-        # 1. 计算原始相似度 (Cosine)
-        raw_scores = self._matrix @ query_vec  # shape: (N,)
+        if self._batcher is None:
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = _BatchedSearcher(self)
+        return self._batcher.submit(query_vec, limit)
 
-        # 2. 应用加权
-        final_scores = raw_scores * self._boost_factors
+    def search(self, query_text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        语义搜索 (带加权)。
+        Score = Cosine_Similarity * Boost_Factor
+        """
+        return self.search_async(query_text, limit).result()
 
-        # 3. Top-K
-        top_indices = np.argsort(final_scores)[::-1][:limit]
+    def reload(self):
+        """强制从 SQLite 重新加载，并重建磁盘缓存"""
+        self._loaded = False
+        self._load(use_cache=False)
 
-        results = []
-        for idx in top_indices:
-            results.append({
-                'article_id': int(self._article_ids[idx]),
-                'score': float(final_scores[idx]),
-                'raw_score': float(raw_scores[idx]) # Debug info
-            })
 
-        return results
 
-    def reload(self):
-        """强制重新加载"""
-        self._loaded = False
-        self._load()
+class _BatchedSearcher:
+    """
+    查询合批: 后台线程取到首个请求后先取走已排队的请求；确有并发 (不止一条) 时才再等待
+    至多 BATCH_WINDOW 秒或凑满 BATCH_MAX 条，合成一次 VectorIndex._search_batch。
+    单独到达的查询不等待，仅多一次线程切换。
+    """
+
+    def __init__(self, index: VectorIndex):
+        self._index = index
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="vector-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query_vec: np.ndarray, limit: int) -> Future:
+        future = Future()
+        self._queue.put((query_vec, limit, future))
+        return future
+
+    def _run(self):
+        import time
+        while True:
+            items = [self._queue.get()]
+            while len(items) < BATCH_MAX:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # 已有并发排队时再等一个窗口凑批；单条请求直接检索
+            deadline = time.monotonic() + BATCH_WINDOW
+            while 1 < len(items) < BATCH_MAX:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            vecs, limits, futures = zip(*items)
+            try:
+                results = self._index._search_batch(list(vecs), list(limits))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, res in zip(futures, results):
+                future.set_result(res)
 
 
 
@@ -225,6 +568,10 @@ def get_vector_index(db_path: str = 'legal_database.db') -> VectorIndex:
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
 
+    if "--export-onnx" in sys.argv:
+        export_onnx_model()
+        sys.exit(0)
+
     idx = VectorIndex()
     results = idx.search("股权转让", limit=5)
     print(f"\n搜索 '股权转让', Top-5:")